@@ -17,6 +17,7 @@ MAX_DOCS = None  # None = todos los documentos, o un número para limitar (útil
 DEFAULT_TOP_K = 50  # Resultados por defecto (paginados en frontend)
 MAX_TOP_K = 100     # Maximo permitido
 SNIPPET_LENGTH = 300
+LANGUAGES_CACHE_TTL = 60  # Segundos que se reutilizan los idiomas disponibles y sus stats.json
 
 # Idiomas soportados
 SUPPORTED_LANGUAGES = ["es", "ca", "pt"]
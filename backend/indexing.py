@@ -1,5 +1,12 @@
+import gc
 from collections import Counter
+from collections.abc import Iterator, Mapping, Sequence
+from contextlib import contextmanager
 from math import log, sqrt
+from operator import itemgetter
+
+import numpy as np
+from numba import njit
 
 
 def compute_tf(tokens: list[str]) -> dict[str, float]:
@@ -48,40 +55,420 @@ def build_inverted_index(tfidf_vectors: dict[str, dict[str, float]]) -> dict[str
             postings = index.setdefault(term, [])
             postings.append((doc_id, weight))
     for term, postings in index.items():
-        postings.sort(key=lambda x: x[1], reverse=True)
+        postings.sort(key=itemgetter(1), reverse=True)
     return index
 
 
+@contextmanager
+def gc_disabled() -> Iterator[None]:
+    """
+    Desactiva el recolector ciclico durante una fase de ingesta: se crean
+    millones de objetos sin ciclos (conteos, arrays, cadenas) y cada recoleccion
+    los recorreria en balde. Al salir se recoge una vez y se reactiva.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.collect()
+        if was_enabled:
+            gc.enable()
+
+
+@njit(cache=True)
+def tfidf_kernel(term_ids, counts, n_tokens, idf_arr, out_tfidf):
+    """
+    Calcula los pesos TF-IDF de un documento en `out_tfidf` y devuelve
+    la suma de sus cuadrados (norma al cuadrado). Compilado con Numba.
+    """
+    s = 0.0
+    inv = 1.0 / n_tokens
+    for i in range(term_ids.size):
+        w = counts[i] * inv * idf_arr[term_ids[i]]
+        out_tfidf[i] = w
+        s += w * w
+    return s
+
+
+@njit(cache=True)
+def count_terms_kernel(token_ids, counts, out_terms, out_counts):
+    """
+    Cuenta las apariciones de cada term_id de un documento sin diccionario:
+    `counts` es un buffer del tamaño del vocabulario a cero (se deja a cero al
+    salir, para reutilizarlo). Escribe los term_ids distintos, en orden de
+    primera aparicion, en `out_terms` y sus conteos en `out_counts`; devuelve
+    cuantos hay. Compilado con Numba.
+    """
+    n = 0
+    for t in token_ids:
+        if counts[t] == 0:
+            out_terms[n] = t
+            n += 1
+        counts[t] += 1
+    for i in range(n):
+        out_counts[i] = counts[out_terms[i]]
+        counts[out_terms[i]] = 0
+    return n
+
+
+def finalize_postings(docs, weights, max_postings: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte los postings de un termino a dos arrays paralelos (doc int32, peso float32),
+    ordenados por peso descendente y limitados a los `max_postings` de mayor peso.
+
+    Si hay mas postings que `max_postings`, se seleccionan en O(n) a partir del
+    peso de corte (`np.partition`) y solo se ordenan los seleccionados. Entre los
+    empatados con el corte se conservan los primeros en orden de entrada: el
+    resultado es el mismo que ordenar todo de forma estable y truncar.
+    """
+    docs = np.asarray(docs, dtype=np.int32)
+    weights = np.asarray(weights, dtype=np.float32)
+    if len(weights) > max_postings:
+        cutoff = np.partition(weights, -max_postings)[-max_postings]
+        above = np.flatnonzero(weights > cutoff)
+        ties = np.flatnonzero(weights == cutoff)[:max_postings - len(above)]
+        top = np.sort(np.concatenate([above, ties]))
+        docs, weights = docs[top], weights[top]
+    order = np.argsort(-weights, kind="stable")
+    return docs[order], weights[order]
+
+
+def quantize_weights(weights) -> tuple[np.ndarray, float]:
+    """
+    Cuantiza los pesos de un termino a uint8 de forma lineal respecto a su peso
+    maximo (255 = maximo). Los pesos positivos nunca bajan de 1, para que todo
+    documento del posting siga puntuando. Devuelve (pesos uint8, peso maximo).
+    """
+    weights = np.asarray(weights, dtype=np.float32)
+    max_weight = float(weights.max()) if len(weights) else 0.0
+    if max_weight <= 0.0:
+        return np.zeros(len(weights), dtype=np.uint8), 0.0
+    quantized = np.rint(weights * (255.0 / max_weight))
+    quantized = np.where(weights > 0.0, np.clip(quantized, 1, 255), 0)
+    return quantized.astype(np.uint8), max_weight
+
+
+@njit(cache=True, nogil=True)
+def find_string_kernel(data, offsets, order, key):
+    """
+    Busqueda binaria de `key` (bytes UTF-8 como uint8) en una tabla de cadenas
+    (`data` + `offsets`) ordenada, o recorrida en el orden de la permutacion
+    `order` si no esta vacia, comparando bytes sin decodificar ninguna cadena.
+    Devuelve su posicion en la tabla o -1. Compilado con Numba.
+    """
+    n_key = key.size
+    n = offsets.size - 1
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        pos = order[mid] if order.size else mid
+        start, length = offsets[pos], offsets[pos + 1] - offsets[pos]
+        cmp = 0
+        for i in range(min(length, n_key)):
+            if data[start + i] != key[i]:
+                cmp = -1 if data[start + i] < key[i] else 1
+                break
+        if cmp == 0:
+            cmp = length - n_key
+        if cmp < 0:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo == n:
+        return -1
+    pos = order[lo] if order.size else lo
+    if offsets[pos + 1] - offsets[pos] != n_key:
+        return -1
+    start = offsets[pos]
+    for i in range(n_key):
+        if data[start + i] != key[i]:
+            return -1
+    return pos
+
+
+# Permutacion vacia: la tabla de cadenas ya esta ordenada (ver find_string_kernel)
+_SORTED = np.zeros(0, dtype=np.int32)
+
+
+class Vocabulary(Sequence):
+    """
+    Tabla de cadenas guardada como los bytes UTF-8 de todas ellas concatenados
+    (`data`), con la cadena `i` en `offsets[i]:offsets[i + 1]`. Se usa para el
+    vocabulario ordenado y para la tabla doc_int_id -> ID del articulo.
+    Pensada para mapearse en memoria: las cadenas solo se decodifican al acceder a ellas.
+
+    Si la tabla no esta ordenada (doc_ids), `order` es la permutacion de sus
+    posiciones en orden de bytes y `find` busca a traves de ella.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, order: np.ndarray | None = None):
+        self.data = data
+        self.offsets = offsets
+        self.order = order
+
+    @classmethod
+    def from_terms(cls, terms: Sequence[str]) -> "Vocabulary":
+        """Empaqueta una lista de cadenas (ya ordenada si es un vocabulario) en formato de bytes + offsets."""
+        encoded = [term.encode("utf-8") for term in terms]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    @staticmethod
+    def sort_order(terms: Sequence[str]) -> np.ndarray:
+        """
+        Permutacion (int32) que recorre `terms` en orden de bytes UTF-8 (el orden
+        de code points de Python coincide con el de sus bytes).
+        """
+        return np.array(sorted(range(len(terms)), key=terms.__getitem__), dtype=np.int32)
+
+    def find(self, term: str) -> int | None:
+        """
+        Posicion de `term` en la tabla, o None si no esta. Busqueda binaria
+        sobre los bytes UTF-8 con `find_string_kernel`.
+        """
+        position = find_string_kernel(
+            self.data,
+            self.offsets,
+            self.order if self.order is not None else _SORTED,
+            np.frombuffer(term.encode("utf-8"), dtype=np.uint8),
+        )
+        return position if position >= 0 else None
+
+    def __getitem__(self, term_id: int) -> str:
+        return self.data[self.offsets[term_id]:self.offsets[term_id + 1]].tobytes().decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+class CSRIndex(Mapping):
+    """
+    Indice invertido en formato CSR: los postings de todos los terminos en dos
+    arrays planos (doc_int_id int32, peso float32), con los del termino `term_id`
+    en `offsets[term_id]:offsets[term_id + 1]`. Se comporta como un diccionario
+    de solo lectura termino -> (docs, pesos).
+
+    Los pesos son TF-IDF ya divididos por la norma de su documento, de modo que
+    el producto escalar con la consulta es el coseno salvo por la norma de esta.
+
+    Los pesos se guardan cuantizados a uint8 respecto al maximo de cada termino
+    (`max_weights`); el acceso por termino los devuelve ya escalados a float32.
+
+    Los terminos estan ordenados en un `Vocabulary` (el orden de code points
+    coincide con el de sus bytes UTF-8), asi que `term_id` se obtiene por
+    busqueda binaria sobre los bytes, sin un dict ni decodificar cadenas.
+    """
+
+    def __init__(
+        self,
+        terms: Vocabulary,
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        weights: np.ndarray,
+        max_weights: np.ndarray,
+    ):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights          # uint8, relativos al maximo de cada termino
+        self.max_weights = max_weights  # float32, peso maximo de cada termino
+
+    @classmethod
+    def from_postings(cls, inverted_index: dict[str, tuple[np.ndarray, np.ndarray]]) -> "CSRIndex":
+        """Empaqueta un diccionario termino -> (docs, pesos) en formato CSR."""
+        terms = sorted(inverted_index)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(inverted_index[term][0]) for term in terms], out=offsets[1:])
+        docs = np.empty(offsets[-1], dtype=np.int32)
+        weights = np.empty(offsets[-1], dtype=np.uint8)
+        max_weights = np.zeros(len(terms), dtype=np.float32)
+        for term_id, term in enumerate(terms):
+            a, b = offsets[term_id], offsets[term_id + 1]
+            docs[a:b] = inverted_index[term][0]
+            weights[a:b], max_weights[term_id] = quantize_weights(inverted_index[term][1])
+        return cls(Vocabulary.from_terms(terms), offsets, docs, weights, max_weights)
+
+    def term_id(self, term: str) -> int | None:
+        """Posicion del termino en el vocabulario ordenado, o None si no existe."""
+        return self.terms.find(term)
+
+    def postings(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Postings (docs, pesos float32 reescalados) de un term_id."""
+        a, b = self.offsets[term_id], self.offsets[term_id + 1]
+        scale = np.float32(self.max_weights[term_id] / 255.0)
+        return self.docs[a:b], self.weights[a:b] * scale
+
+    def __getitem__(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        term_id = self.term_id(term)
+        if term_id is None:
+            raise KeyError(term)
+        return self.postings(term_id)
+
+    def __contains__(self, term: object) -> bool:
+        return isinstance(term, str) and self.term_id(term) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+class TermValues(Mapping):
+    """
+    Valores por termino (p. ej. IDF) guardados como un array alineado con el
+    vocabulario ordenado de un `CSRIndex`. Se comporta como un diccionario termino -> float.
+    """
+
+    def __init__(self, index: CSRIndex, values: np.ndarray):
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, term: str) -> float:
+        term_id = self.index.term_id(term)
+        if term_id is None:
+            raise KeyError(term)
+        return float(self.values[term_id])
+
+    def __contains__(self, term: object) -> bool:
+        return term in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index.terms)
+
+    def __len__(self) -> int:
+        return len(self.index.terms)
+
+
+@njit(cache=True, nogil=True)
+def maxscore_kernel(term_ids, query_weights, offsets, docs, weights, max_weights, top_k, scores, candidates):
+    """
+    Acumula en `scores` (indexado por doc_int_id) el producto escalar entre la
+    consulta y los postings CSR de sus terminos, reescalando los pesos uint8
+    con el peso maximo de cada termino, con poda estilo MaxScore:
+
+    - Los terminos se recorren por cota superior (peso de consulta * peso maximo)
+      descendente; sus postings ya estan ordenados por peso descendente.
+    - Tras cada termino, el umbral es el k-esimo mejor score parcial (cota
+      inferior del k-esimo score final).
+    - Un documento nuevo cuya aportacion mas la cota de los terminos restantes
+      no alcanza el umbral no puede entrar en el top-k: se marca con -inf y no
+      se acumula ni se añade a los candidatos.
+
+    Los documentos con score se guardan en `candidates` (sin recorrer todo
+    `scores` despues). Devuelve (numero de candidatos, numero de podados); el
+    top-k y los scores de sus documentos son exactos. Compilado con Numba;
+    libera el GIL para que varias busquedas puntuen en paralelo.
+    """
+    n_terms = term_ids.size
+    bounds = np.empty(n_terms, dtype=np.float64)
+    for i in range(n_terms):
+        bounds[i] = query_weights[i] * max_weights[term_ids[i]]
+    remaining = bounds.sum()
+
+    threshold = 0.0
+    n_candidates = 0
+    n_pruned = 0
+    for i in np.argsort(-bounds):
+        term_id = term_ids[i]
+        remaining -= bounds[i]
+        scale = query_weights[i] * max_weights[term_id] / 255.0
+        for j in range(offsets[term_id], offsets[term_id + 1]):
+            doc = docs[j]
+            contribution = scale * weights[j]
+            if contribution <= 0.0:
+                continue
+            if scores[doc] == 0.0:
+                if contribution + remaining < threshold:
+                    scores[doc] = -np.inf
+                    n_pruned += 1
+                    continue
+                candidates[n_candidates] = doc
+                n_candidates += 1
+            scores[doc] += contribution
+
+        if n_candidates >= top_k and remaining > 0.0:
+            partial = scores[candidates[:n_candidates]]
+            threshold = np.partition(partial, n_candidates - top_k)[n_candidates - top_k]
+    return n_candidates, n_pruned
+
+
 def compute_query_vector(query_tokens: list[str], idf: dict[str, float]) -> dict[str, float]:
     tf = compute_tf(query_tokens)
     return {term: tf_val * idf.get(term, 0.0) for term, tf_val in tf.items() if term in idf}
 
 
+def query_term_weights(
+    query_tokens: list[str],
+    index: CSRIndex,
+    idf: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vector TF-IDF de la consulta como (term_ids, pesos): cada termino se busca
+    una sola vez en el vocabulario y su IDF se lee del array alineado con los
+    term_id del indice. Los terminos fuera del vocabulario se descartan.
+    """
+    term_counts = Counter(query_tokens)
+    n_tokens = len(query_tokens)
+    term_ids, tf = [], []
+    for term, count in term_counts.items():
+        term_id = index.term_id(term)
+        if term_id is not None:
+            term_ids.append(term_id)
+            tf.append(count / n_tokens)
+    term_ids = np.array(term_ids, dtype=np.int64)
+    return term_ids, np.array(tf, dtype=np.float64) * idf[term_ids]
+
+
 def rank_documents(
     query_tokens: list[str],
-    index: dict[str, list[tuple[str, float]]],
-    idf: dict[str, float],
-    doc_norms: dict[str, float],
+    index: CSRIndex,
+    idf: np.ndarray,
+    n_docs: int,
     top_k: int = 10,
-) -> list[tuple[str, float]]:
-    from collections import defaultdict
-
-    query_vec = compute_query_vector(query_tokens, idf)
-    if not query_vec:
-        return []
-    query_norm = sqrt(sum(weight * weight for weight in query_vec.values()))
+) -> tuple[list[tuple[int, float]], int]:
+    """
+    Ranking por similitud coseno sobre un indice CSR con pesos pre-normalizados.
+    `idf` es el array float32 alineado con el vocabulario del indice y `n_docs`
+    el numero de doc_int_id. Los productos escalares se acumulan con poda
+    MaxScore en `maxscore_kernel` y el top-k se selecciona por particion; a igual
+    score gana el doc_int_id menor.
+    Devuelve los top-k (doc_int_id, score) y el numero total de documentos con score.
+    """
+    term_ids, query_weights = query_term_weights(query_tokens, index, idf)
+    if not term_ids.size:
+        return [], 0
+    query_norm = sqrt(float(np.dot(query_weights, query_weights)))
     if query_norm == 0.0:
-        return []
-    scores: dict[str, float] = defaultdict(float)
-    for term, q_weight in query_vec.items():
-        postings = index.get(term, [])
-        for doc_id, d_weight in postings:
-            scores[doc_id] += q_weight * d_weight
-    results: list[tuple[str, float]] = []
-    for doc_id, dot in scores.items():
-        norm = doc_norms.get(doc_id, 0.0)
-        if norm > 0.0:
-            score = dot / (norm * query_norm)
-            results.append((doc_id, score))
-    results.sort(key=lambda x: x[1], reverse=True)
-    return results[:top_k]
+        return [], 0
+
+    scores = np.zeros(n_docs, dtype=np.float64)
+    max_candidates = int((index.offsets[term_ids + 1] - index.offsets[term_ids]).sum())
+    candidates = np.empty(min(max_candidates, n_docs), dtype=np.int64)
+    n_candidates, n_pruned = maxscore_kernel(
+        term_ids, query_weights,
+        index.offsets, index.docs, index.weights, index.max_weights,
+        top_k, scores, candidates,
+    )
+
+    # Documentos con score (los podados cuentan en el total pero no pueden estar
+    # en el top-k), ordenados por doc_int_id: a igual score gana siempre el
+    # doc_int_id menor. Antes los empates quedaban en el orden en que el
+    # documento aparecia en las postings de la consulta.
+    total = n_candidates + n_pruned
+    candidates = np.sort(candidates[:n_candidates])
+    final = scores[candidates] / query_norm
+
+    # Top-k en O(n + k log k): umbral por particion y ordenacion completa solo
+    # de los k seleccionados. Los empatados con el umbral se toman por
+    # doc_int_id, no en el orden arbitrario que deja argpartition
+    if len(final) > top_k:
+        threshold = np.partition(final, -top_k)[-top_k]
+        above = np.flatnonzero(final > threshold)
+        tied = np.flatnonzero(final == threshold)[:top_k - len(above)]
+        top = np.concatenate((above, tied))
+        candidates, final = candidates[top], final[top]
+    order = np.argsort(-final, kind="stable")
+    return list(zip(candidates[order].tolist(), final[order].tolist())), total
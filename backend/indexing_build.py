@@ -0,0 +1,417 @@
+"""
+Constructor del indice invertido de Wikipedia, comun a todos los idiomas.
+
+Los scripts build_index.py, build_index_ca.py y build_index_pt.py solo fijan
+los parametros de su idioma y llaman a build(); toda la pipeline (pool de
+preprocesamiento, kernel TF-IDF, volcado CSR, cuantizacion) vive aqui.
+
+Fases:
+- Fase 1: Unica pasada sobre el corpus: DF, metadatos y volcado de los
+  conteos (doc_id, term_id, count) de cada documento
+- Fase 2: Calcular IDF y fijar el vocabulario ordenado
+- Fase 3: Releer los conteos volcados para calcular TF-IDF y normas
+  (sin volver a tokenizar ni a hacer stemming); los pesos de los postings
+  se guardan ya divididos por la norma del documento
+- Fase 4: Ordenar, limitar y cuantizar los postings de cada termino
+- Fase 5: Guardar el indice final
+"""
+import gc
+import io
+import json
+import os
+import struct
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
+from datetime import datetime
+from math import sqrt
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+
+from config import SNIPPET_LENGTH
+from indexing import finalize_postings, gc_disabled, quantize_weights, tfidf_kernel
+from persistent_index import INVERTED_INDEX_FILES, DocMetadataWriter, dump_doc_ids, dump_vocabulary
+from preprocessing import _get_stopwords, _get_stemmer, index_terms
+from wikipedia_loader import WikiArticle, iter_shard_articles, list_wiki_shards
+
+# Cache token -> stem de cada proceso (la distribucion de Wikipedia es muy zipfiana)
+_token_cache: dict[str, str | None] = {}
+
+# Limite de postings por termino (para ahorrar memoria)
+MAX_POSTINGS_PER_TERM = 10000
+
+# Registros de los conteos de la Fase 1:
+# (doc_int_id, term_id, count) por posting y (n_tokens, n_terminos) por documento
+_POSTING_DTYPE = np.dtype([("doc", "<u4"), ("term", "<u4"), ("count", "<u4")])
+_LENGTH_RECORD = struct.Struct("<II")
+_TMP_BUFFER_SIZE = 1 << 20
+
+# Fase 4: hilos que ordenan y cuantizan postings (NumPy libera el GIL al ordenar)
+# y tramos de terminos por hilo, para repartir la carga de los terminos frecuentes
+_SORT_THREADS = os.cpu_count() or 1
+_RANGES_PER_THREAD = 4
+
+# Capacidad inicial del array de DF (se duplica al llenarse)
+_INITIAL_VOCAB_SIZE = 1 << 16
+
+# Stopwords y stemmer de cada proceso del pool (ver _init_lang)
+_worker_stopwords: frozenset[str] = frozenset()
+_worker_stemmer = None
+
+
+def timestamp() -> str:
+    """Devuelve marca de tiempo actual."""
+    return datetime.now().strftime("%H:%M:%S")
+
+
+def preprocess_document_fast(text: str, stopwords: frozenset, stemmer) -> list[str]:
+    """Pipeline optimizado de preprocesamiento (ver index_terms, con cache de stems)."""
+    return index_terms(text, stopwords, stemmer, _token_cache)
+
+
+def _init_lang(language: str) -> None:
+    """Inicializa stopwords, stemmer y cache de stems en un proceso del pool."""
+    global _worker_stopwords, _worker_stemmer
+    gc.disable()  # Los procesos solo crean objetos sin ciclos (ver gc_disabled)
+    _worker_stopwords = _get_stopwords(language)
+    _worker_stemmer = _get_stemmer(language)
+    _token_cache.clear()  # Los stems dependen del idioma
+
+
+def _process_article(article: WikiArticle) -> tuple[str, Counter, int, dict[str, str]] | None:
+    """Preprocesa un articulo en un proceso del pool: (id, conteos, n_tokens, metadatos)."""
+    tokens = preprocess_document_fast(article.text, _worker_stopwords, _worker_stemmer)
+    if not tokens:
+        return None
+    metadata = {
+        "title": article.title,
+        "url": article.url,
+        "snippet": article.text[:SNIPPET_LENGTH].replace("\n", " "),
+    }
+    return article.id, Counter(tokens), len(tokens), metadata
+
+
+def _process_shard(wiki_file: Path) -> list[tuple[str, Counter, int, dict[str, str]]]:
+    """Lee y preprocesa un archivo wiki_XX completo en un proceso del pool."""
+    results = []
+    for article in iter_shard_articles(wiki_file):
+        result = _process_article(article)
+        if result is not None:
+            results.append(result)
+    return results
+
+
+def _finalize_terms(
+    lo: int,
+    hi: int,
+    *,
+    sorted_ids: list[int],
+    posting_offsets: np.ndarray,
+    spill_docs: np.ndarray,
+    spill_w: np.ndarray,
+    csr_offsets: np.ndarray,
+    csr_docs: np.ndarray,
+    csr_weights: np.ndarray,
+    max_weights: np.ndarray,
+) -> int:
+    """
+    Fase 4 de los terminos lo..hi del vocabulario ordenado: ordena, limita y
+    cuantiza sus postings y los escribe en su tramo de los arrays CSR (cada
+    tramo es disjunto, asi que varios hilos pueden escribir a la vez).
+    Devuelve el numero de terminos procesados.
+    """
+    for new_id in range(lo, hi):
+        term_id = sorted_ids[new_id]
+        a, b = posting_offsets[term_id], posting_offsets[term_id + 1]
+        c, d = csr_offsets[new_id], csr_offsets[new_id + 1]
+        csr_docs[c:d], term_weights = finalize_postings(spill_docs[a:b], spill_w[a:b], MAX_POSTINGS_PER_TERM)
+        csr_weights[c:d], max_weights[new_id] = quantize_weights(term_weights)
+    return hi - lo
+
+
+def build(
+    lang_code: str,
+    extracted_dir: Path,
+    output_dir: Path,
+    language: str,
+    keep_tf_in_ram: bool,
+    max_docs: int | None = None,
+) -> None:
+    """
+    Construye el indice invertido de un idioma.
+
+    Args:
+        lang_code: Codigo del idioma ("es", "ca", "pt"), guardado en los metadatos
+        extracted_dir: Directorio con los articulos extraidos por WikiExtractor
+        output_dir: Directorio de salida del indice
+        language: Idioma NLTK de stopwords y stemmer
+        keep_tf_in_ram: Mantener los conteos de la Fase 1 y los postings de la
+            Fase 3 en memoria en lugar de volcarlos a ficheros temporales
+        max_docs: Limite de documentos a indexar (None = todos)
+    """
+    print("=" * 60)
+    print(f"[{timestamp()}] CONSTRUCCION DEL INDICE DE WIKIPEDIA ({lang_code.upper()})")
+    print("=" * 60)
+
+    if not extracted_dir.exists():
+        print(f"[ERROR] Directorio no encontrado: {extracted_dir}")
+        return
+
+    start_time = time.time()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Conteos por documento: ficheros temporales o buffers en memoria
+    postings_tmp = output_dir / "postings.tmp"
+    lengths_tmp = output_dir / "doc_lengths.tmp"
+    if keep_tf_in_ram:
+        postings_out, lengths_out = io.BytesIO(), io.BytesIO()
+    else:
+        postings_out = open(postings_tmp, "wb", buffering=_TMP_BUFFER_SIZE)
+        lengths_out = open(lengths_tmp, "wb", buffering=_TMP_BUFFER_SIZE)
+
+    # =========================================================================
+    # FASE 1: Unica pasada - Calcular DF, guardar metadatos y volcar conteos
+    # =========================================================================
+    print(f"\n[{timestamp()}] [FASE 1] Pasada unica: calculando DF y volcando conteos...")
+    if max_docs:
+        print(f"  Limite: {max_docs:,} documentos")
+
+    vocab: dict[str, int] = {}  # termino -> term_id
+    intern = vocab.setdefault   # termino -> term_id, asignando el siguiente si es nuevo
+    df = np.zeros(_INITIAL_VOCAB_SIZE, dtype=np.int64)  # DF indexado por term_id (crece x2)
+    doc_ids: list[str] = []     # doc_int_id -> id del articulo
+    doc_count = 0
+
+    # Manifiesto de shards: el directorio se recorre una sola vez
+    shards = list_wiki_shards(extracted_dir)
+    print(f"  {len(shards):,} archivos wiki_XX en {extracted_dir}")
+
+    # Cada proceso del pool lee, parsea y preprocesa un shard completo; la fusion
+    # (DF, volcado) es serie y sigue el orden de los shards (imap ordenado: los
+    # doc_int_ids y el limite de max_docs no dependen del reparto entre procesos).
+    # Los metadatos se escriben en streaming (una columna por campo)
+    with Pool(initializer=_init_lang, initargs=(language,)) as pool, \
+         DocMetadataWriter(output_dir) as metadata_out, \
+         gc_disabled():
+        results = chain.from_iterable(pool.imap(_process_shard, shards))
+        for doc_id, term_counts, n_tokens, metadata in results:
+            if max_docs and doc_count >= max_docs:
+                print(f"\n  [WARN] Limite alcanzado: {max_docs} documentos")
+                break
+
+            # Convertir los terminos del documento en term_ids (una llamada por termino,
+            # el resto en NumPy): DF y registros (doc_id, term_id, count) por documento
+            n_terms = len(term_counts)
+            term_ids = np.fromiter(
+                (intern(term, len(vocab)) for term in term_counts), dtype=np.uint32, count=n_terms
+            )
+            if len(vocab) > df.size:
+                df = np.concatenate([df, np.zeros(max(df.size, len(vocab) - df.size), dtype=np.int64)])
+            df[term_ids] += 1  # Los terminos de un documento son unicos
+
+            records = np.empty(n_terms, dtype=_POSTING_DTYPE)
+            records["doc"] = doc_count
+            records["term"] = term_ids
+            records["count"] = np.fromiter(term_counts.values(), dtype=np.uint32, count=n_terms)
+            postings_out.write(records.tobytes())
+            lengths_out.write(_LENGTH_RECORD.pack(n_tokens, n_terms))
+
+            # Guardar metadatos
+            doc_ids.append(doc_id)
+            metadata["lang"] = lang_code
+            metadata_out.write(metadata)
+
+            doc_count += 1
+
+            if doc_count % 10000 == 0:
+                elapsed = time.time() - start_time
+                rate = doc_count / elapsed if elapsed > 0 else 0
+                print(f"  [{timestamp()}] {doc_count:,} docs | {len(vocab):,} terminos | {rate:.0f} docs/s")
+
+    if not keep_tf_in_ram:
+        postings_out.close()
+        lengths_out.close()
+
+    print(f"\n  [{timestamp()}] Total: {doc_count:,} documentos, {len(vocab):,} terminos unicos")
+
+    # Tabla doc_int_id -> id del articulo (los postings guardan el entero)
+    dump_doc_ids(doc_ids, output_dir)
+
+    # =========================================================================
+    # FASE 2: Calcular IDF
+    # =========================================================================
+    print(f"\n[{timestamp()}] [FASE 2] Calculando IDF...")
+
+    df = df[:len(vocab)]
+    idf_arr = (np.log((doc_count + 1) / (df + 1.0)) + 1.0).astype(np.float32)  # Por term_id de Fase 1
+
+    # Vocabulario final ordenado: el termino i del indice es sorted_ids[i] en Fase 1
+    terms = sorted(vocab)
+    sorted_ids = [vocab[term] for term in terms]
+
+    print(f"  [{timestamp()}] IDF calculado para {len(idf_arr):,} terminos")
+
+    # Guardar vocabulario e IDF (ya definitivos; resume_phase3.py parte de ellos)
+    dump_vocabulary(terms, output_dir)
+    np.save(output_dir / "idf.npy", idf_arr[sorted_ids])
+
+    # Cada termino tiene exactamente df postings: reservar su tramo en el volcado
+    posting_offsets = np.zeros(len(df) + 1, dtype=np.int64)
+    np.cumsum(df, out=posting_offsets[1:])
+
+    del df, vocab  # Liberar memoria
+
+    # =========================================================================
+    # FASE 3: Construir indice invertido a partir de los conteos volcados
+    # =========================================================================
+    print(f"\n[{timestamp()}] [FASE 3] Construyendo indice invertido desde los conteos...")
+
+    if keep_tf_in_ram:
+        doc_lengths = np.frombuffer(lengths_out.getbuffer(), dtype=np.uint32).reshape(-1, 2)
+    else:
+        doc_lengths = np.fromfile(lengths_tmp, dtype=np.uint32).reshape(-1, 2)
+    norms = np.zeros(doc_count, dtype=np.float64)
+
+    # Postings agrupados en su tramo por termino (inversion en dos pasadas):
+    # aparte de los postings, solo se guarda el cursor de escritura de cada termino
+    spill_docs_tmp = output_dir / "postings_docs.tmp"
+    spill_w_tmp = output_dir / "postings_w.tmp"
+    total_postings = int(posting_offsets[-1])
+
+    if doc_count:
+        if keep_tf_in_ram:
+            spill_docs = np.empty(total_postings, dtype=np.int32)
+            spill_w = np.empty(total_postings, dtype=np.float32)
+            records = np.frombuffer(postings_out.getbuffer(), dtype=_POSTING_DTYPE)
+        else:
+            spill_docs = np.memmap(spill_docs_tmp, dtype=np.int32, mode="w+", shape=(total_postings,))
+            spill_w = np.memmap(spill_w_tmp, dtype=np.float32, mode="w+", shape=(total_postings,))
+            records = np.memmap(postings_tmp, dtype=_POSTING_DTYPE, mode="r")
+        cursor = posting_offsets[:-1].copy()
+
+        # Los registros de cada documento son contiguos: bounds[d]..bounds[d+1]
+        bounds = np.zeros(doc_count + 1, dtype=np.int64)
+        np.cumsum(doc_lengths[:, 1], out=bounds[1:])
+        term_col = records["term"]
+        count_col = records["count"]
+        out_tfidf = np.empty(int(doc_lengths[:, 1].max()), dtype=np.float32)
+
+        for doc_int in range(doc_count):
+            a, b = bounds[doc_int], bounds[doc_int + 1]
+            term_ids = term_col[a:b]
+            weights = out_tfidf[:b - a]
+            norm_sq = tfidf_kernel(term_ids, count_col[a:b], int(doc_lengths[doc_int, 0]), idf_arr, weights)
+            norms[doc_int] = sqrt(norm_sq)
+            if norm_sq > 0.0:
+                weights /= norms[doc_int]  # Pre-normalizado: el coseno solo divide por la norma de la consulta
+
+            # Los terminos de un documento son unicos: escritura dispersa sin colisiones
+            pos = cursor[term_ids]
+            spill_docs[pos] = doc_int
+            spill_w[pos] = weights
+            cursor[term_ids] += 1
+
+            if (doc_int + 1) % 50000 == 0:
+                print(f"  [{timestamp()}] {doc_int + 1:,}/{doc_count:,} documentos indexados...")
+
+        if not keep_tf_in_ram:
+            spill_docs.flush()
+            spill_w.flush()
+        del records, term_col, count_col, term_ids, pos, cursor  # Liberar los conteos antes de borrarlos
+
+    doc_norms = norms.astype(np.float32)  # Indexado por doc_int_id
+
+    del doc_lengths, norms
+    if keep_tf_in_ram:
+        del postings_out, lengths_out
+    else:
+        postings_tmp.unlink()
+        lengths_tmp.unlink()
+
+    print(f"\n  [{timestamp()}] Indexados: {doc_count:,} documentos")
+
+    # =========================================================================
+    # FASE 4: Ordenar postings
+    # =========================================================================
+    print(f"\n[{timestamp()}] [FASE 4] Ordenando postings por relevancia...")
+    print(f"  (Conservando los {MAX_POSTINGS_PER_TERM:,} postings de mayor peso por termino)")
+
+    # Postings finales en formato CSR (doc_int_id int32, tfidf/norma uint8 cuantizado), leidos
+    # termino a termino y escritos directamente a disco
+    csr_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(np.minimum(np.diff(posting_offsets), MAX_POSTINGS_PER_TERM)[sorted_ids], out=csr_offsets[1:])
+    n_postings = int(csr_offsets[-1])
+    csr_docs = np.lib.format.open_memmap(
+        output_dir / INVERTED_INDEX_FILES["postings_docs"], mode="w+", dtype=np.int32, shape=(n_postings,)
+    )
+    csr_weights = np.lib.format.open_memmap(
+        output_dir / INVERTED_INDEX_FILES["postings_weights"], mode="w+", dtype=np.uint8, shape=(n_postings,)
+    )
+    max_weights = np.zeros(len(terms), dtype=np.float32)  # Escala de la cuantizacion uint8
+
+    if doc_count:
+        # Tramos contiguos del vocabulario ordenado con un numero similar de postings
+        n_ranges = _SORT_THREADS * _RANGES_PER_THREAD
+        work = np.cumsum(np.diff(posting_offsets)[sorted_ids])
+        bounds = np.searchsorted(work, np.arange(1, n_ranges) * (work[-1] / n_ranges), side="right")
+        bounds = np.unique(np.concatenate([[0], bounds, [len(terms)]])).tolist()
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=_SORT_THREADS) as executor:
+            finalize = partial(
+                _finalize_terms, sorted_ids=sorted_ids, posting_offsets=posting_offsets,
+                spill_docs=spill_docs, spill_w=spill_w, csr_offsets=csr_offsets,
+                csr_docs=csr_docs, csr_weights=csr_weights, max_weights=max_weights,
+            )
+            for n in executor.map(finalize, bounds[:-1], bounds[1:]):
+                done += n
+                print(f"  [{timestamp()}] {done:,}/{len(terms):,} terminos procesados...")
+
+        del spill_docs, spill_w
+        if not keep_tf_in_ram:
+            spill_docs_tmp.unlink()
+            spill_w_tmp.unlink()
+
+    csr_docs.flush()
+    csr_weights.flush()
+    del csr_docs, csr_weights
+
+    # =========================================================================
+    # FASE 5: Guardar indice final
+    # =========================================================================
+    print(f"\n[{timestamp()}] [FASE 5] Guardando indice en disco...")
+
+    # Completar el indice CSR (vocabulario y arrays de postings ya estan en disco)
+    np.save(output_dir / INVERTED_INDEX_FILES["postings_offsets"], csr_offsets)
+    np.save(output_dir / INVERTED_INDEX_FILES["term_max_weights"], max_weights)
+
+    np.save(output_dir / "doc_norms.npy", doc_norms)
+
+    elapsed = time.time() - start_time
+    stats = {
+        "total_documents": doc_count,
+        "vocabulary_size": len(terms),
+        "build_time_seconds": round(elapsed, 2),
+        "language": lang_code,
+        "max_docs_limit": max_docs,
+        "max_postings_per_term": MAX_POSTINGS_PER_TERM,
+    }
+    with open(output_dir / "stats.json", "w", encoding="utf-8") as f:
+        json.dump(stats, f, indent=2)
+
+    # =========================================================================
+    # Resumen final
+    # =========================================================================
+    print("\n" + "=" * 60)
+    print(f"[{timestamp()}] INDICE {lang_code.upper()} CONSTRUIDO EXITOSAMENTE")
+    print("=" * 60)
+    print(f"  Documentos indexados: {doc_count:,}")
+    print(f"  Terminos en vocabulario: {len(terms):,}")
+    print(f"  Tiempo total: {elapsed:.1f}s ({elapsed/60:.1f} min)")
+    print(f"  Indice guardado en: {output_dir}")
+    print("=" * 60)
+    print("\nEjecuta merge_indexes.py para fusionar con el resto de idiomas")
@@ -7,12 +7,16 @@ Este backend proporciona:
 - Endpoints para cada paso del pipeline de RI
 - Índice invertido persistente con TF-IDF
 """
+import asyncio
+import threading
+import time
 from contextlib import asynccontextmanager
-from math import sqrt
-from collections import Counter
+from typing import Any
 
+import orjson
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from config import DEFAULT_TOP_K, MAX_TOP_K, SNIPPET_LENGTH, SUPPORTED_LANGUAGES, DEFAULT_INDEX_LANG, LANGUAGE_MAP
@@ -21,9 +25,27 @@ from preprocessing import (
     tokenize_text,
     remove_stopwords_tokens,
     lemmatize_or_stem_tokens,
+    analyze_text,
+    _get_stopwords,
 )
-from indexing import compute_tf
-from persistent_index import PersistentIndex
+from indexing import compute_tf, rank_documents
+from persistent_index import LanguageIndex, PersistentIndex
+
+
+# =============================================================================
+# Serialización de respuestas
+# =============================================================================
+class ORJSONResponse(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson en una sola llamada, sin pasar por
+    jsonable_encoder. Admite claves no str y arrays/escalares de NumPy.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
 
 
 # =============================================================================
@@ -31,14 +53,38 @@ from persistent_index import PersistentIndex
 # =============================================================================
 index = PersistentIndex()
 
+# Las búsquedas se ejecutan en hilos: la carga de un idioma en el índice
+# compartido se serializa con este lock
+_index_lock = threading.Lock()
+
+
+def _get_lang_index(lang: str) -> LanguageIndex | None:
+    """
+    Índice de un idioma (cargándolo si hace falta), o None si no existe. Cada
+    petición trabaja con su `LanguageIndex`, que no cambia aunque otras
+    peticiones carguen otros idiomas.
+    """
+    with _index_lock:
+        return index.get(lang)
+
+
+def _check_language(lang: str) -> None:
+    """Rechaza con 400 los idiomas no soportados."""
+    if lang not in SUPPORTED_LANGUAGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idioma '{lang}' no soportado. Usa: {', '.join(SUPPORTED_LANGUAGES)}"
+        )
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Muestra idiomas disponibles al iniciar el servidor."""
-    available = index.available_languages()
-    if available:
-        print(f"Indices disponibles: {', '.join(available)}")
-        print("Los indices se cargan bajo demanda en la primera busqueda.")
+    """Precarga todos los idiomas disponibles al iniciar el servidor."""
+    # Los indices estan mapeados en memoria: tenerlos todos cargados es barato y
+    # evita que la primera busqueda de cada idioma pague la carga
+    loaded = index.load_all()
+    if loaded:
+        print(f"Indices cargados: {', '.join(loaded)}")
     else:
         print("AVISO: No hay indices. Ejecuta los scripts de indexacion primero.")
     yield
@@ -52,6 +98,7 @@ app = FastAPI(
     description="Buscador de artículos de Wikipedia en español usando TF-IDF",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configurar CORS para permitir peticiones desde el frontend
@@ -107,7 +154,7 @@ class IndexStats(BaseModel):
 @app.get("/")
 async def root():
     """Endpoint de bienvenida."""
-    return {
+    return ORJSONResponse({
         "message": "WikiSearch API - Sistema de Recuperación de Información",
         "version": "1.0.0",
         "available_languages": index.available_languages(),
@@ -117,48 +164,44 @@ async def root():
             "languages": "/languages",
             "document": "/document/{doc_id}",
         }
-    }
+    })
 
 
 @app.get("/languages")
 async def get_languages():
     """Lista los idiomas disponibles con estadisticas (sin cargar indices)."""
-    import json
+    # stats.json de cada idioma, cacheado por el indice (no se lee en cada peticion)
     languages = []
-    for lang in index.available_languages():
-        # Leer stats.json directamente sin cargar el indice completo
-        stats_path = index._get_paths(lang)["stats"]
-        docs = 0
-        terms = 0
-        if stats_path.exists():
-            with open(stats_path, "r", encoding="utf-8") as f:
-                stats_data = json.load(f)
-                docs = stats_data.get("total_documents", 0)
-                terms = stats_data.get("vocabulary_size", 0)
+    for lang, stats_data in index.language_stats().items():
         languages.append({
             "code": lang,
             "name": {"es": "Castellano", "ca": "Catalán", "pt": "Portugués"}.get(lang, lang),
-            "documents": docs,
-            "terms": terms,
+            "documents": stats_data.get("total_documents", 0),
+            "terms": stats_data.get("vocabulary_size", 0),
         })
-    return {"languages": languages}
-
-
-@app.get("/stats", response_model=IndexStats)
-async def get_stats():
-    """Obtiene estadisticas del indice actual."""
-    stats = index.stats
-    return IndexStats(
-        total_documents=len(index.doc_metadata) if index.current_lang else 0,
-        vocabulary_size=len(index.inverted_index) if index.current_lang else 0,
-        index_loaded=index.current_lang is not None,
-        current_language=index.current_lang,
-        available_languages=index.available_languages(),
-        build_time_seconds=stats.get("build_time_seconds"),
-    )
+    return ORJSONResponse({"languages": languages})
 
 
-@app.get("/search", response_model=SearchResponse)
+# Los endpoints devuelven ORJSONResponse ya construidas: sin response_model no hay
+# validación ni jsonable_encoder; los modelos solo documentan la respuesta en OpenAPI
+@app.get("/stats", response_model=None, responses={200: {"model": IndexStats}})
+async def get_stats(
+    lang: str = Query(DEFAULT_INDEX_LANG, description="Idioma del indice (es, ca, pt)"),
+):
+    """Obtiene estadisticas del indice de un idioma."""
+    _check_language(lang)
+    lang_index = _get_lang_index(lang)
+    return ORJSONResponse({
+        "total_documents": len(lang_index.doc_metadata) if lang_index else 0,
+        "vocabulary_size": len(lang_index.inverted_index) if lang_index else 0,
+        "index_loaded": lang_index is not None,
+        "current_language": lang if lang_index else None,
+        "available_languages": index.available_languages(),
+        "build_time_seconds": lang_index.stats.get("build_time_seconds") if lang_index else None,
+    })
+
+
+@app.get("/search", response_model=None, responses={200: {"model": SearchResponse}})
 async def search(
     q: str = Query(..., description="Consulta de busqueda"),
     lang: str = Query(DEFAULT_INDEX_LANG, description="Idioma del indice (es, ca, pt)"),
@@ -173,31 +216,38 @@ async def search(
     3. Calcula vector TF-IDF de la consulta
     4. Calcula similitud coseno con documentos del indice
     5. Devuelve los top-k documentos mas relevantes
-    """
-    import time
-    start = time.time()
     
+    El trabajo de CPU (pasos 1-5) se ejecuta en el pool de hilos con
+    asyncio.to_thread, sin bloquear el event loop para otras peticiones.
+    """
     # Validar idioma
-    if lang not in SUPPORTED_LANGUAGES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Idioma '{lang}' no soportado. Usa: {', '.join(SUPPORTED_LANGUAGES)}"
-        )
+    _check_language(lang)
     
-    # Cargar indice del idioma si no esta cargado
-    if not index.exists(lang):
+    # Idioma cargado o con indice en disco (sin comprobar los ficheros en cada consulta)
+    if not index.has_language(lang):
         raise HTTPException(
             status_code=503,
             detail=f"Indice para '{lang}' no disponible. Ejecuta el script de indexacion."
         )
     
-    # Cambiar de idioma si es necesario
-    if index.current_lang != lang:
-        print(f"Cambiando indice de [{index.current_lang}] a [{lang}]")
-        index.unload()
-        index.load(lang)
+    return ORJSONResponse(await asyncio.to_thread(_do_search, q, lang, top_k))
+
+
+def _do_search(q: str, lang: str, top_k: int) -> dict[str, Any]:
+    """Cuerpo síncrono de /search: carga del idioma, preprocesamiento, ranking y respuesta."""
+    start = time.time()
     
-    print(f"Buscando '{q}' en indice [{index.current_lang}] ({len(index.doc_metadata)} docs)")
+    # Todos los idiomas quedan cargados a la vez: se usa el del parámetro lang
+    # (cargándolo si aún no lo estaba)
+    lang_index = _get_lang_index(lang)
+    if lang_index is None:
+        raise HTTPException(status_code=503, detail=f"Indice para '{lang}' no disponible.")
+    inverted_index = lang_index.inverted_index
+    idf = lang_index.idf.values
+    doc_ids = lang_index.doc_ids
+    doc_metadata = lang_index.doc_metadata
+    
+    print(f"Buscando '{q}' en indice [{lang}] ({len(doc_metadata)} docs)")
     
     # Obtener idioma NLTK para preprocesamiento
     nltk_lang = LANGUAGE_MAP.get(lang, "spanish")
@@ -208,87 +258,55 @@ async def search(
     tokens = lemmatize_or_stem_tokens(tokens, language=nltk_lang)
     
     if not tokens:
-        return SearchResponse(
-            query=q,
-            total_results=0,
-            results=[],
-            processing_time_ms=0,
-        )
-    
-    # Calcular vector TF-IDF de la consulta
-    term_counts = Counter(tokens)
-    n_tokens = len(tokens)
-    query_vec: dict[str, float] = {}
-    
-    for term, count in term_counts.items():
-        if term in index.idf:
-            tf = count / n_tokens
-            query_vec[term] = tf * index.idf[term]
-    
-    if not query_vec:
-        return SearchResponse(
-            query=q,
-            total_results=0,
-            results=[],
-            processing_time_ms=(time.time() - start) * 1000,
-        )
-    
-    # Calcular norma de la consulta
-    query_norm = sqrt(sum(w * w for w in query_vec.values()))
-    
-    # Calcular similitud coseno con documentos
-    scores: dict[str, float] = {}
-    for term, q_weight in query_vec.items():
-        postings = index.inverted_index.get(term, [])
-        for doc_id, d_weight in postings:
-            if doc_id not in scores:
-                scores[doc_id] = 0.0
-            scores[doc_id] += q_weight * d_weight
-    
-    # Normalizar por normas de documentos
-    results: list[tuple[str, float]] = []
-    for doc_id, dot_product in scores.items():
-        doc_norm = index.doc_norms.get(doc_id, 0.0)
-        if doc_norm > 0 and query_norm > 0:
-            cosine_sim = dot_product / (doc_norm * query_norm)
-            results.append((doc_id, cosine_sim))
+        return {
+            "query": q,
+            "total_results": 0,
+            "results": [],
+            "processing_time_ms": 0,
+        }
     
-    # Ordenar por score descendente
-    results.sort(key=lambda x: x[1], reverse=True)
-    results = results[:top_k]
+    # Similitud coseno vectorizada: vector TF-IDF de la consulta, acumulacion de los
+    # postings CSR (ya divididos por la norma de cada documento) en un array de
+    # scores por doc_int_id y top-k con argpartition
+    ranking, total_results = rank_documents(tokens, inverted_index, idf, len(doc_ids), top_k)
     
-    # Construir respuesta
+    # Construir respuesta: solo se decodifican los metadatos de los top-k (por doc_int_id)
     search_results = []
-    for doc_id, score in results:
-        metadata = index.doc_metadata.get(doc_id, {})
-        search_results.append(SearchResult(
-            doc_id=doc_id,
-            title=metadata.get("title", "Sin título"),
-            url=metadata.get("url", ""),
-            snippet=metadata.get("snippet", "")[:SNIPPET_LENGTH],
-            score=round(score, 4),
-        ))
+    for doc, score in ranking:
+        metadata = doc_metadata.record(doc)
+        search_results.append({
+            "doc_id": doc_ids[doc],
+            "title": metadata.get("title", "Sin título"),
+            "url": metadata.get("url", ""),
+            "snippet": metadata.get("snippet", "")[:SNIPPET_LENGTH],
+            "score": round(score, 4),
+        })
     
     elapsed_ms = (time.time() - start) * 1000
     
-    return SearchResponse(
-        query=q,
-        total_results=len(scores),
-        results=search_results,
-        processing_time_ms=round(elapsed_ms, 2),
-    )
+    return {
+        "query": q,
+        "total_results": total_results,
+        "results": search_results,
+        "processing_time_ms": round(elapsed_ms, 2),
+    }
 
 
 @app.get("/document/{doc_id}")
-async def get_document(doc_id: str):
+async def get_document(
+    doc_id: str,
+    lang: str = Query(DEFAULT_INDEX_LANG, description="Idioma del indice (es, ca, pt)"),
+):
     """Obtiene los metadatos de un documento específico."""
-    metadata = index.doc_metadata.get(doc_id)
+    _check_language(lang)
+    lang_index = _get_lang_index(lang)
+    metadata = lang_index.doc_metadata.get(doc_id) if lang_index else None
     if not metadata:
         raise HTTPException(status_code=404, detail="Documento no encontrado")
-    return {
+    return ORJSONResponse({
         "doc_id": doc_id,
         **metadata,
-    }
+    })
 
 
 # =============================================================================
@@ -298,74 +316,71 @@ async def get_document(doc_id: str):
 async def lexical_analysis(document: str):
     """Normalización básica del texto."""
     normalized = normalize_text(document)
-    return {"original": document, "normalized": normalized}
+    return ORJSONResponse({"original": document, "normalized": normalized})
 
 
 @app.post("/tokenize")
 async def tokenize(document: str):
     """Tokenización del texto."""
     tokens = tokenize_text(document)
-    return {"document": document, "tokens": tokens, "count": len(tokens)}
+    return ORJSONResponse({"document": document, "tokens": tokens, "count": len(tokens)})
 
 
 @app.post("/remove_stopwords")
 async def remove_stopwords(tokens: list[str], language: str = "spanish"):
     """Eliminación de palabras vacías."""
-    filtered = remove_stopwords_tokens(tokens, language=language)
+    # Los tokens recibidos pueden venir en mayúsculas: se comparan en minúsculas
+    # pero se devuelven tal como llegaron
+    stopwords = _get_stopwords(language)
+    filtered = [t for t in tokens if t.lower() not in stopwords]
     removed = len(tokens) - len(filtered)
-    return {
+    return ORJSONResponse({
         "original_tokens": tokens,
         "filtered_tokens": filtered,
         "removed_count": removed,
-    }
+    })
 
 
 @app.post("/lemmatize")
 async def lemmatize(tokens: list[str], language: str = "spanish"):
     """Lematización/stemming de tokens."""
     lemmatized = lemmatize_or_stem_tokens(tokens, language=language)
-    return {
+    return ORJSONResponse({
         "original_tokens": tokens,
         "lemmatized_tokens": lemmatized,
-    }
+    })
 
 
 @app.post("/weight_terms")
 async def weight_terms(terms: list[str]):
     """Calcula pesos TF de términos."""
     weights = compute_tf(terms)
-    return {"terms": terms, "weights": weights}
+    return ORJSONResponse({"terms": terms, "weights": weights})
 
 
 @app.post("/analyze_query")
-async def analyze_query(query: str, language: str = "spanish"):
+async def analyze_query(query: str, language: str = "spanish", lang: str = DEFAULT_INDEX_LANG):
     """
     Muestra el pipeline completo de análisis de una consulta.
     Útil para la memoria y demostración del sistema.
     """
-    # Paso 1: Normalización
-    normalized = normalize_text(query)
-    
-    # Paso 2: Tokenización
-    tokens = tokenize_text(query)
-    
-    # Paso 3: Eliminación de stopwords
-    tokens_no_sw = remove_stopwords_tokens(tokens, language=language)
-    
-    # Paso 4: Stemming
-    stems = lemmatize_or_stem_tokens(tokens_no_sw, language=language)
+    # Pasos 1-4: Normalización, tokenización, eliminación de stopwords y stemming
+    # (cada paso reutiliza la salida del anterior, sin volver a recorrer la consulta)
+    normalized, tokens, tokens_no_sw, stems = analyze_text(query, language=language)
     
     # Paso 5: Pesos TF
     tf_weights = compute_tf(stems)
     
-    # Paso 6: Pesos TF-IDF (si hay índice)
+    # Paso 6: Pesos TF-IDF (si hay índice para el idioma `lang`)
     tfidf_weights = {}
-    if index.exists():
+    _check_language(lang)
+    lang_index = _get_lang_index(lang)
+    if lang_index is not None:
         for term, tf in tf_weights.items():
-            idf_val = index.idf.get(term, 0.0)
+            idf_val = lang_index.idf.get(term, 0.0)
             tfidf_weights[term] = round(tf * idf_val, 4)
     
-    return {
+    return ORJSONResponse({
         "query": query,
         "pipeline": {
             "1_normalized": normalized,
@@ -375,9 +390,22 @@ async def analyze_query(query: str, language: str = "spanish"):
             "5_tf_weights": tf_weights,
             "6_tfidf_weights": tfidf_weights if tfidf_weights else "Índice no cargado",
         }
-    }
+    })
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Producción: un worker por núcleo (cada uno mapea los índices y el sistema
+    # operativo comparte la caché de páginas entre ellos), uvloop y httptools
+    # cuando están instalados ("auto") y sin log de accesos
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=os.cpu_count() or 1,
+        loop="auto",
+        http="auto",
+        access_log=False,
+        log_level="warning",
+    )
@@ -9,14 +9,32 @@ Fusiona los indices de:
 Uso:
     python merge_indexes.py
 """
+import heapq
 import json
-import pickle
 import time
-from collections import defaultdict
+from array import array
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
 
+import numpy as np
+
 from config import INDEX_DIR
+from indexing import CSRIndex, finalize_postings, quantize_weights
+from persistent_index import (
+    DOC_IDS_FILES,
+    DOC_METADATA_FIELDS,
+    DOC_METADATA_FILES,
+    INVERTED_INDEX_FILES,
+    dump_doc_ids,
+    dump_vocabulary,
+    load_doc_ids,
+    load_doc_metadata_columns,
+    load_inverted_index,
+)
 
 # Limite de postings por termino en el indice final
 MAX_POSTINGS_PER_TERM = 10000
@@ -27,6 +45,24 @@ def timestamp() -> str:
     return datetime.now().strftime("%H:%M:%S")
 
 
+def _iter_vocabulary(lang: str, index: CSRIndex) -> Iterator[tuple[str, str, int]]:
+    """Recorre el vocabulario ordenado de un idioma como (termino, idioma, term_id)."""
+    for term_id, term in enumerate(index.terms):
+        yield term, lang, term_id
+
+
+def _load_language(lang: str, idx_dir: Path) -> tuple[CSRIndex, np.ndarray, list[str], np.ndarray]:
+    """
+    Carga el indice de un idioma: CSR, IDF y normas de documentos (mapeados en
+    memoria) y doc_ids con prefijo de idioma.
+    """
+    index = load_inverted_index(idx_dir)
+    idf = np.load(idx_dir / "idf.npy", mmap_mode="r")
+    doc_ids = [f"{lang}_{doc_id}" for doc_id in load_doc_ids(idx_dir)]
+    norms = np.load(idx_dir / "doc_norms.npy", mmap_mode="r")
+    return index, idf, doc_ids, norms
+
+
 def merge_indexes() -> None:
     """Fusiona los indices de todos los idiomas."""
     print("=" * 60)
@@ -43,119 +79,77 @@ def merge_indexes() -> None:
     }
 
     # =========================================================================
-    # Cargar y fusionar metadatos
-    # =========================================================================
-    print(f"\n[{timestamp()}] Fusionando metadatos...")
-
-    merged_metadata = {}
-    for lang, idx_dir in index_dirs.items():
-        metadata_file = idx_dir / "doc_metadata.json"
-        if not metadata_file.exists():
-            print(f"  [WARN] No encontrado: {metadata_file}")
-            continue
-
-        print(f"  [{timestamp()}] Cargando {lang}...")
-        with open(metadata_file, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
-        
-        # Prefijo para evitar colisiones de IDs entre idiomas
-        for doc_id, doc_data in metadata.items():
-            merged_id = f"{lang}_{doc_id}"
-            merged_metadata[merged_id] = doc_data
-        
-        print(f"    {len(metadata):,} documentos")
-        del metadata
-
-    print(f"\n  [{timestamp()}] Total: {len(merged_metadata):,} documentos")
-
-    # =========================================================================
-    # Fusionar indices invertidos
-    # =========================================================================
-    print(f"\n[{timestamp()}] Fusionando indices invertidos...")
-
-    merged_index = defaultdict(list)
-    
-    for lang, idx_dir in index_dirs.items():
-        index_file = idx_dir / "inverted_index.pkl"
-        if not index_file.exists():
-            print(f"  [WARN] No encontrado: {index_file}")
-            continue
-
-        print(f"  [{timestamp()}] Cargando {lang}...")
-        with open(index_file, "rb") as f:
-            index = pickle.load(f)
-        
-        print(f"    {len(index):,} terminos")
-        
-        # Fusionar postings con prefijo de idioma
-        for term, postings in index.items():
-            for doc_id, tfidf in postings:
-                merged_id = f"{lang}_{doc_id}"
-                merged_index[term].append((merged_id, tfidf))
-        
-        del index
-
-    print(f"\n  [{timestamp()}] Total: {len(merged_index):,} terminos unicos")
-
-    # =========================================================================
-    # Fusionar normas de documentos
+    # Cargar indices (un hilo por idioma; los arrays se mapean en memoria)
     # =========================================================================
-    print(f"\n[{timestamp()}] Fusionando normas de documentos...")
+    print(f"\n[{timestamp()}] Cargando indices invertidos...")
 
-    merged_norms = {}
-    
+    available: dict[str, Path] = {}
     for lang, idx_dir in index_dirs.items():
-        norms_file = idx_dir / "doc_norms.json"
-        if not norms_file.exists():
-            print(f"  [WARN] No encontrado: {norms_file}")
+        terms_file = idx_dir / INVERTED_INDEX_FILES["terms"]
+        if not terms_file.exists():
+            print(f"  [WARN] No encontrado: {terms_file}")
             continue
+        available[lang] = idx_dir
 
-        print(f"  [{timestamp()}] Cargando {lang}...")
-        with open(norms_file, "r", encoding="utf-8") as f:
-            norms = json.load(f)
-        
-        for doc_id, norm in norms.items():
-            merged_id = f"{lang}_{doc_id}"
-            merged_norms[merged_id] = norm
-        
-        print(f"    {len(norms):,} documentos")
-        del norms
+    indexes: dict[str, CSRIndex] = {}  # idioma -> indice CSR
+    idfs: dict[str, np.ndarray] = {}   # idioma -> IDF alineado con su vocabulario
+    doc_offsets: dict[str, int] = {}   # idioma -> desplazamiento de sus doc_int_ids
+    merged_doc_ids: list[str] = []     # doc_int_id fusionado -> id con prefijo de idioma
+    norm_parts: list[np.ndarray] = []  # normas por doc_int_id, en el mismo orden que doc_ids
 
-    # =========================================================================
-    # Fusionar IDF (usar el maximo para cada termino)
-    # =========================================================================
-    print(f"\n[{timestamp()}] Fusionando IDF...")
+    # Hilos y no procesos: la lectura de disco libera el GIL y los arrays mapeados
+    # no se copian entre procesos. Los resultados se recogen en orden de idioma
+    with ThreadPoolExecutor(max_workers=max(len(available), 1)) as executor:
+        futures = {lang: executor.submit(_load_language, lang, idx_dir) for lang, idx_dir in available.items()}
+        for lang, future in futures.items():
+            indexes[lang], idfs[lang], doc_ids, norms = future.result()
+            print(f"  [{timestamp()}] {lang}: {len(indexes[lang]):,} terminos, {len(doc_ids):,} documentos")
 
-    merged_idf = {}
-    
-    for lang, idx_dir in index_dirs.items():
-        idf_file = idx_dir / "idf.json"
-        if not idf_file.exists():
-            continue
+            # Los doc_int_ids de este idioma van tras los ya fusionados
+            doc_offsets[lang] = len(merged_doc_ids)
+            merged_doc_ids.extend(doc_ids)
+            norm_parts.append(norms)
+            del doc_ids, norms
 
-        print(f"  [{timestamp()}] Cargando {lang}...")
-        with open(idf_file, "r", encoding="utf-8") as f:
-            idf = json.load(f)
-        
-        for term, value in idf.items():
-            if term not in merged_idf or value > merged_idf[term]:
-                merged_idf[term] = value
-        
-        del idf
+    merged_langs = list(indexes)  # idiomas fusionados, en orden de doc_int_id
 
-    print(f"\n  [{timestamp()}] Total: {len(merged_idf):,} terminos")
+    merged_norms = np.concatenate(norm_parts) if norm_parts else np.zeros(0, dtype=np.float32)
+    del norm_parts
 
     # =========================================================================
-    # Ordenar y limitar postings
+    # Fusionar vocabularios (k-way merge de los vocabularios ordenados)
     # =========================================================================
-    print(f"\n[{timestamp()}] Ordenando y limitando postings...")
-
-    for term in merged_index:
-        # Ordenar por TF-IDF descendente
-        merged_index[term].sort(key=lambda x: x[1], reverse=True)
-        # Limitar a MAX_POSTINGS_PER_TERM
-        if len(merged_index[term]) > MAX_POSTINGS_PER_TERM:
-            merged_index[term] = merged_index[term][:MAX_POSTINGS_PER_TERM]
+    print(f"\n[{timestamp()}] Fusionando vocabularios...")
+
+    # Cada vocabulario ya esta ordenado: heapq.merge produce la union ordenada
+    # en streaming, sin un diccionario con todos los terminos
+    merged_terms: list[str] = []
+    sources = {lang: array("q") for lang in merged_langs}  # termino fusionado -> term_id del idioma (-1 si falta)
+    streams = [_iter_vocabulary(lang, indexes[lang]) for lang in merged_langs]
+    for term, group in groupby(heapq.merge(*streams), key=itemgetter(0)):
+        present = {lang: term_id for _, lang, term_id in group}
+        merged_terms.append(term)
+        for lang in merged_langs:
+            sources[lang].append(present.get(lang, -1))
+
+    n_terms = len(merged_terms)
+    source_ids = {lang: np.frombuffer(sources[lang], dtype=np.int64) for lang in merged_langs}
+    del sources
+
+    print(f"\n  [{timestamp()}] Total: {n_terms:,} terminos unicos")
+
+    # Postings por termino fusionado (limitados) e IDF fusionado (maximo entre idiomas)
+    n_postings = np.zeros(n_terms, dtype=np.int64)
+    merged_idf = np.zeros(n_terms, dtype=np.float32)
+    for lang in merged_langs:
+        term_ids = source_ids[lang]
+        present = term_ids >= 0
+        n_postings[present] += np.diff(indexes[lang].offsets)[term_ids[present]]
+        merged_idf[present] = np.maximum(merged_idf[present], idfs[lang][term_ids[present]])
+
+    csr_offsets = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(np.minimum(n_postings, MAX_POSTINGS_PER_TERM), out=csr_offsets[1:])
+    del n_postings
 
     # =========================================================================
     # Guardar indice fusionado
@@ -166,35 +160,97 @@ def merge_indexes() -> None:
     backup_dir = INDEX_DIR / "backup_es"
     if not backup_dir.exists():
         backup_dir.mkdir(parents=True)
-        for f in ["inverted_index.pkl", "doc_metadata.json", "doc_norms.json", "idf.json"]:
+        for f in [*INVERTED_INDEX_FILES.values(), *DOC_IDS_FILES.values(), *DOC_METADATA_FILES.values(), "doc_norms.npy", "idf.npy"]:
             src = INDEX_DIR / f
             if src.exists():
                 import shutil
                 shutil.copy(src, backup_dir / f)
         print(f"  [{timestamp()}] Backup creado en {backup_dir}")
 
-    # Guardar archivos fusionados
-    print(f"  [{timestamp()}] Guardando inverted_index.pkl...")
-    with open(INDEX_DIR / "inverted_index.pkl", "wb") as f:
-        pickle.dump(dict(merged_index), f)
-
-    print(f"  [{timestamp()}] Guardando doc_metadata.json...")
-    with open(INDEX_DIR / "doc_metadata.json", "w", encoding="utf-8") as f:
-        json.dump(merged_metadata, f, ensure_ascii=False)
-
-    print(f"  [{timestamp()}] Guardando doc_norms.json...")
-    with open(INDEX_DIR / "doc_norms.json", "w", encoding="utf-8") as f:
-        json.dump(merged_norms, f)
-
-    print(f"  [{timestamp()}] Guardando idf.json...")
-    with open(INDEX_DIR / "idf.json", "w", encoding="utf-8") as f:
-        json.dump(merged_idf, f)
+    # Postings de cada termino: union de los de cada idioma, ordenados por TF-IDF
+    # descendente y limitados a MAX_POSTINGS_PER_TERM, escritos directamente a disco (CSR).
+    # Los pesos ya vienen divididos por la norma de su documento: se copian tal cual
+    print(f"  [{timestamp()}] Guardando indice invertido (CSR)...")
+    dump_vocabulary(merged_terms, INDEX_DIR)
+    total = int(csr_offsets[-1])
+    csr_docs = np.lib.format.open_memmap(
+        INDEX_DIR / INVERTED_INDEX_FILES["postings_docs"], mode="w+", dtype=np.int32, shape=(total,)
+    )
+    csr_weights = np.lib.format.open_memmap(
+        INDEX_DIR / INVERTED_INDEX_FILES["postings_weights"], mode="w+", dtype=np.uint8, shape=(total,)
+    )
+    max_weights = np.zeros(n_terms, dtype=np.float32)
+
+    for new_id in range(n_terms):
+        present = [(lang, int(source_ids[lang][new_id])) for lang in merged_langs if source_ids[lang][new_id] >= 0]
+        c, d = csr_offsets[new_id], csr_offsets[new_id + 1]
+        if len(present) == 1:
+            # Termino de un solo idioma: sus postings ya estan ordenados y limitados,
+            # se copian con sus pesos uint8 y su escala sin volver a cuantizarlos
+            lang, term_id = present[0]
+            source = indexes[lang]
+            a, b = source.offsets[term_id], source.offsets[term_id + 1]
+            csr_docs[c:d] = source.docs[a:b] + doc_offsets[lang]
+            csr_weights[c:d] = source.weights[a:b]
+            max_weights[new_id] = source.max_weights[term_id]
+        else:
+            term_docs, term_weights = [], []
+            for lang, term_id in present:
+                docs, weights = indexes[lang].postings(term_id)
+                term_docs.append(docs + doc_offsets[lang])
+                term_weights.append(weights)
+            csr_docs[c:d], final_weights = finalize_postings(
+                np.concatenate(term_docs), np.concatenate(term_weights), MAX_POSTINGS_PER_TERM
+            )
+            csr_weights[c:d], max_weights[new_id] = quantize_weights(final_weights)
+
+        if (new_id + 1) % 500000 == 0:
+            print(f"  [{timestamp()}] {new_id + 1:,}/{n_terms:,} terminos fusionados...")
+
+    csr_docs.flush()
+    csr_weights.flush()
+    del csr_docs, csr_weights
+    np.save(INDEX_DIR / INVERTED_INDEX_FILES["postings_offsets"], csr_offsets)
+    np.save(INDEX_DIR / INVERTED_INDEX_FILES["term_max_weights"], max_weights)
+
+    print(f"  [{timestamp()}] Guardando tabla de doc_ids...")
+    dump_doc_ids(merged_doc_ids, INDEX_DIR)
+
+    # Metadatos: cada columna es la concatenacion de las de cada idioma (bytes
+    # copiados tal cual y offsets desplazados), escrita a disco sin decodificar
+    print(f"  [{timestamp()}] Guardando metadatos (columnas)...")
+    n_docs = len(merged_doc_ids)
+    lang_columns = {lang: load_doc_metadata_columns(index_dirs[lang]) for lang in merged_langs}
+    for field, (data_key, offsets_key) in DOC_METADATA_FIELDS.items():
+        tables = [lang_columns[lang][field] for lang in merged_langs]
+        data = np.lib.format.open_memmap(
+            INDEX_DIR / DOC_METADATA_FILES[data_key], mode="w+", dtype=np.uint8,
+            shape=(sum(len(table.data) for table in tables),),
+        )
+        offsets = np.zeros(n_docs + 1, dtype=np.int64)
+        pos = doc = 0
+        for table in tables:
+            data[pos:pos + len(table.data)] = table.data
+            offsets[doc + 1:doc + len(table) + 1] = table.offsets[1:] + pos
+            pos += len(table.data)
+            doc += len(table)
+        data.flush()
+        del data
+        np.save(INDEX_DIR / DOC_METADATA_FILES[offsets_key], offsets)
+        print(f"    {field}: {pos:,} bytes")
+    del lang_columns
+
+    print(f"  [{timestamp()}] Guardando doc_norms.npy...")
+    np.save(INDEX_DIR / "doc_norms.npy", merged_norms)
+
+    print(f"  [{timestamp()}] Guardando idf.npy...")
+    np.save(INDEX_DIR / "idf.npy", merged_idf)
 
     # Estadisticas
     elapsed = time.time() - start_time
     stats = {
-        "total_documents": len(merged_metadata),
-        "vocabulary_size": len(merged_index),
+        "total_documents": n_docs,
+        "vocabulary_size": n_terms,
         "merge_time_seconds": round(elapsed, 2),
         "languages": ["es", "ca", "pt"],
         "max_postings_per_term": MAX_POSTINGS_PER_TERM,
@@ -208,8 +264,8 @@ def merge_indexes() -> None:
     print("\n" + "=" * 60)
     print(f"[{timestamp()}] INDICES FUSIONADOS EXITOSAMENTE")
     print("=" * 60)
-    print(f"  Documentos totales: {len(merged_metadata):,}")
-    print(f"  Terminos totales: {len(merged_index):,}")
+    print(f"  Documentos totales: {n_docs:,}")
+    print(f"  Terminos totales: {n_terms:,}")
     print(f"  Tiempo: {elapsed:.1f}s ({elapsed/60:.1f} min)")
     print(f"  Indice guardado en: {INDEX_DIR}")
     print("=" * 60)
@@ -7,31 +7,267 @@ Soporta índices separados por idioma:
 - index/pt/ - Índice portugués
 
 Cada índice contiene:
-- inverted_index.pkl - Índice invertido
-- idf.json - IDF de términos
-- doc_norms.json - Normas de documentos
-- doc_metadata.json - Metadatos (título, URL, snippet)
+- terms.npy, term_offsets.npy - Vocabulario ordenado (bytes UTF-8 + offsets)
+- postings_offsets.npy - Inicio de los postings de cada término (CSR)
+- postings_docs.npy - doc_int_id de todos los postings (CSR)
+- postings_weights.npy - Pesos TF-IDF / norma del documento de todos los postings (CSR, uint8 cuantizados)
+- term_max_weights.npy - Peso máximo de cada término (escala de la cuantización)
+- doc_ids.npy, doc_id_offsets.npy - Tabla doc_int_id -> ID del artículo (bytes UTF-8 + offsets)
+- doc_id_order.npy - doc_int_ids ordenados por ID del artículo (búsqueda binaria por ID)
+- idf.npy - IDF de términos (float32 indexado por term_id)
+- doc_norms.npy - Normas de documentos (float32 indexado por doc_int_id)
+- doc_{titles,urls,snippets,langs}.npy, doc_{title,url,snippet,lang}_offsets.npy -
+  Metadatos en columnas: una tabla de cadenas (bytes UTF-8 + offsets) por campo
 - stats.json - Estadísticas
 """
 import json
-import pickle
+import time
+from array import array
+from collections.abc import Iterator, Mapping, Sequence
 from pathlib import Path
-from typing import Any
-from config import INDEX_DIR, SUPPORTED_LANGUAGES, DEFAULT_INDEX_LANG
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from config import INDEX_DIR, LANGUAGES_CACHE_TTL, SUPPORTED_LANGUAGES, DEFAULT_INDEX_LANG
+from indexing import CSRIndex, TermValues, Vocabulary
+
+# Buffer de escritura de los temporales de metadatos
+_METADATA_BUFFER_SIZE = 1 << 20
+
+# Ficheros del índice invertido en formato CSR (ver indexing.CSRIndex)
+INVERTED_INDEX_FILES = {
+    "terms": "terms.npy",
+    "term_offsets": "term_offsets.npy",
+    "postings_offsets": "postings_offsets.npy",
+    "postings_docs": "postings_docs.npy",
+    "postings_weights": "postings_weights.npy",
+    "term_max_weights": "term_max_weights.npy",
+}
+
+# Tabla doc_int_id -> ID del artículo (mismo formato que el vocabulario), sin
+# ordenar: se guarda además la permutación que la recorre ordenada por ID
+DOC_IDS_FILES = {
+    "doc_ids": "doc_ids.npy",
+    "doc_id_offsets": "doc_id_offsets.npy",
+    "doc_id_order": "doc_id_order.npy",
+}
+
+# Metadatos en columnas: campo -> (bytes UTF-8, offsets) de su tabla de cadenas,
+# indexada por doc_int_id (mismo formato que doc_ids)
+DOC_METADATA_FIELDS = {
+    "title": ("doc_titles", "doc_title_offsets"),
+    "url": ("doc_urls", "doc_url_offsets"),
+    "snippet": ("doc_snippets", "doc_snippet_offsets"),
+    "lang": ("doc_langs", "doc_lang_offsets"),
+}
+DOC_METADATA_FILES = {key: f"{key}.npy" for keys in DOC_METADATA_FIELDS.values() for key in keys}
+
+
+def dump_vocabulary(terms: Sequence[str], index_dir: Path) -> None:
+    """Guarda el vocabulario ordenado (bytes UTF-8 concatenados + offsets)."""
+    vocabulary = terms if isinstance(terms, Vocabulary) else Vocabulary.from_terms(terms)
+    np.save(index_dir / INVERTED_INDEX_FILES["terms"], vocabulary.data)
+    np.save(index_dir / INVERTED_INDEX_FILES["term_offsets"], vocabulary.offsets)
+
+
+def load_vocabulary(index_dir: Path) -> Vocabulary:
+    """Carga (mapeado en memoria) el vocabulario ordenado de un índice."""
+    return Vocabulary(
+        np.load(index_dir / INVERTED_INDEX_FILES["terms"], mmap_mode="r"),
+        np.load(index_dir / INVERTED_INDEX_FILES["term_offsets"], mmap_mode="r"),
+    )
+
+
+def dump_doc_ids(doc_ids: Sequence[str], index_dir: Path) -> None:
+    """
+    Guarda la tabla doc_int_id -> ID del artículo (bytes UTF-8 concatenados +
+    offsets) y su permutación ordenada por ID, para buscar por ID sin decodificarla.
+    """
+    table = Vocabulary.from_terms(doc_ids)
+    np.save(index_dir / DOC_IDS_FILES["doc_ids"], table.data)
+    np.save(index_dir / DOC_IDS_FILES["doc_id_offsets"], table.offsets)
+    np.save(index_dir / DOC_IDS_FILES["doc_id_order"], Vocabulary.sort_order(doc_ids))
+
+
+def load_doc_ids(index_dir: Path) -> Vocabulary:
+    """
+    Carga (mapeada en memoria) la tabla doc_int_id -> ID del artículo; `find`
+    devuelve el doc_int_id de un ID por búsqueda binaria.
+    """
+    return Vocabulary(
+        np.load(index_dir / DOC_IDS_FILES["doc_ids"], mmap_mode="r"),
+        np.load(index_dir / DOC_IDS_FILES["doc_id_offsets"], mmap_mode="r"),
+        np.load(index_dir / DOC_IDS_FILES["doc_id_order"], mmap_mode="r"),
+    )
+
+
+def dump_inverted_index(inverted_index: CSRIndex, index_dir: Path) -> None:
+    """Guarda el índice invertido CSR: vocabulario ordenado y arrays de postings como .npy."""
+    dump_vocabulary(inverted_index.terms, index_dir)
+    np.save(index_dir / INVERTED_INDEX_FILES["postings_offsets"], inverted_index.offsets)
+    np.save(index_dir / INVERTED_INDEX_FILES["postings_docs"], inverted_index.docs)
+    np.save(index_dir / INVERTED_INDEX_FILES["postings_weights"], inverted_index.weights)
+    np.save(index_dir / INVERTED_INDEX_FILES["term_max_weights"], inverted_index.max_weights)
+
+
+def load_inverted_index(index_dir: Path) -> CSRIndex:
+    """
+    Carga un índice guardado con `dump_inverted_index`.
+
+    Todos los arrays (vocabulario incluido) se mapean en memoria en solo
+    lectura: el arranque no lee datos y el sistema operativo pagina solo los
+    términos y postings que se consultan.
+    """
+    return CSRIndex(
+        load_vocabulary(index_dir),
+        np.load(index_dir / INVERTED_INDEX_FILES["postings_offsets"], mmap_mode="r"),
+        np.load(index_dir / INVERTED_INDEX_FILES["postings_docs"], mmap_mode="r"),
+        np.load(index_dir / INVERTED_INDEX_FILES["postings_weights"], mmap_mode="r"),
+        np.load(index_dir / INVERTED_INDEX_FILES["term_max_weights"], mmap_mode="r"),
+    )
+
+
+class DocMetadataWriter:
+    """
+    Escribe los metadatos en streaming, en orden de doc_int_id, como una tabla
+    de cadenas por campo de DOC_METADATA_FIELDS. Los bytes de cada columna se
+    vuelcan a un temporal y al cerrar se guardan como .npy junto a sus offsets.
+    """
+
+    def __init__(self, index_dir: Path):
+        self._index_dir = index_dir
+        self._files = {
+            field: open(index_dir / f"{data_key}.tmp", "wb", buffering=_METADATA_BUFFER_SIZE)
+            for field, (data_key, _) in DOC_METADATA_FIELDS.items()
+        }
+        self._offsets = {field: array("q", [0]) for field in DOC_METADATA_FIELDS}
+        self._count = 0
+
+    def write(self, metadata: Mapping[str, str]) -> None:
+        """Añade los metadatos del siguiente doc_int_id (los campos ausentes quedan vacíos)."""
+        for field, f in self._files.items():
+            value = metadata.get(field, "").encode("utf-8")
+            f.write(value)
+            offsets = self._offsets[field]
+            offsets.append(offsets[-1] + len(value))
+        self._count += 1
+
+    def close(self) -> None:
+        for field, (data_key, offsets_key) in DOC_METADATA_FIELDS.items():
+            tmp_path = Path(self._files[field].name)
+            self._files[field].close()
+            offsets = np.frombuffer(self._offsets[field], dtype=np.int64)
+            data = np.lib.format.open_memmap(
+                self._index_dir / DOC_METADATA_FILES[data_key], mode="w+", dtype=np.uint8, shape=(int(offsets[-1]),)
+            )
+            if len(data):
+                data[:] = np.memmap(tmp_path, dtype=np.uint8, mode="r")
+            data.flush()
+            del data
+            np.save(self._index_dir / DOC_METADATA_FILES[offsets_key], offsets)
+            tmp_path.unlink()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "DocMetadataWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class DocMetadata(Mapping):
+    """
+    Metadatos en columnas mapeadas en memoria: una tabla de cadenas
+    (`Vocabulary`) por campo, indexada por doc_int_id. Solo se decodifican los
+    documentos a los que se accede (en /search, únicamente los top-k resultados).
+
+    Se comporta como un diccionario ID del artículo -> metadatos; el doc_int_id
+    de un ID se busca en la tabla de doc_ids mapeada (búsqueda binaria sobre su
+    permutación ordenada), sin decodificar los IDs en un diccionario.
+    """
+
+    def __init__(self, columns: Mapping[str, Vocabulary], doc_ids: Vocabulary):
+        self.columns = columns
+        self.doc_ids = doc_ids
+
+    def record(self, doc_int: int) -> dict[str, str]:
+        """Metadatos del documento `doc_int`."""
+        return {field: column[doc_int] for field, column in self.columns.items()}
+
+    def __getitem__(self, doc_id: str) -> dict[str, str]:
+        doc_int = self.doc_ids.find(doc_id)
+        if doc_int is None:
+            raise KeyError(doc_id)
+        return self.record(doc_int)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.doc_ids)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+
+def dump_doc_metadata(doc_metadata: Mapping[str, dict[str, str]], doc_ids: Sequence[str], index_dir: Path) -> None:
+    """Guarda los metadatos (una tabla de cadenas por campo) en el orden de `doc_ids`."""
+    with DocMetadataWriter(index_dir) as writer:
+        for doc_id in doc_ids:
+            writer.write(doc_metadata.get(doc_id, {}))
+
+
+def load_doc_metadata_columns(index_dir: Path) -> dict[str, Vocabulary]:
+    """Carga (mapeadas en memoria) las columnas de metadatos: campo -> tabla de cadenas."""
+    return {
+        field: Vocabulary(
+            np.load(index_dir / DOC_METADATA_FILES[data_key], mmap_mode="r"),
+            np.load(index_dir / DOC_METADATA_FILES[offsets_key], mmap_mode="r"),
+        )
+        for field, (data_key, offsets_key) in DOC_METADATA_FIELDS.items()
+    }
+
+
+def open_doc_metadata(index_dir: Path, doc_ids: Vocabulary) -> DocMetadata:
+    """Abre (mapeados en memoria) los metadatos de un índice."""
+    return DocMetadata(load_doc_metadata_columns(index_dir), doc_ids)
+
+
+class LanguageIndex(NamedTuple):
+    """Índice de un idioma cargado (arrays mapeados en memoria)."""
+    inverted_index: CSRIndex
+    doc_ids: Sequence[str]
+    idf: TermValues
+    doc_norms: np.ndarray
+    doc_metadata: DocMetadata
+    stats: dict[str, Any]
 
 
 class PersistentIndex:
     """
     Índice invertido con persistencia en disco.
-    Soporta múltiples idiomas con índices separados.
+    Soporta múltiples idiomas con índices separados, que pueden estar cargados
+    a la vez. No hay idioma "actual": cada consulta obtiene con `get` el
+    `LanguageIndex` (inmutable) de su idioma.
     
     Estructura de archivos:
     index/
     ├── es/
-    │   ├── inverted_index.pkl
-    │   ├── idf.json
-    │   ├── doc_norms.json
-    │   ├── doc_metadata.json
+    │   ├── terms.npy
+    │   ├── term_offsets.npy
+    │   ├── postings_offsets.npy
+    │   ├── postings_docs.npy
+    │   ├── postings_weights.npy
+    │   ├── term_max_weights.npy
+    │   ├── doc_ids.npy
+    │   ├── doc_id_offsets.npy
+    │   ├── doc_id_order.npy
+    │   ├── idf.npy
+    │   ├── doc_norms.npy
+    │   ├── doc_titles.npy, doc_title_offsets.npy
+    │   ├── doc_urls.npy, doc_url_offsets.npy
+    │   ├── doc_snippets.npy, doc_snippet_offsets.npy
+    │   ├── doc_langs.npy, doc_lang_offsets.npy
     │   └── stats.json
     ├── ca/
     └── pt/
@@ -41,15 +277,12 @@ class PersistentIndex:
         self.base_dir = base_dir
         self.base_dir.mkdir(parents=True, exist_ok=True)
         
-        # Idioma actualmente cargado
-        self._current_lang: str | None = None
+        # Índices cargados por idioma (se cargan bajo demanda o con load_all)
+        self._loaded: dict[str, LanguageIndex] = {}
         
-        # Datos en memoria (se cargan bajo demanda)
-        self._inverted_index: dict[str, list[tuple[str, float]]] | None = None
-        self._idf: dict[str, float] | None = None
-        self._doc_norms: dict[str, float] | None = None
-        self._doc_metadata: dict[str, dict[str, str]] | None = None
-        self._stats: dict[str, Any] | None = None
+        # Caché de idiomas disponibles -> stats.json (solo cambian al reconstruir)
+        self._languages_cache: dict[str, dict[str, Any]] | None = None
+        self._languages_cached_at = 0.0
     
     def _get_lang_dir(self, lang: str) -> Path:
         """Obtiene el directorio del índice para un idioma."""
@@ -59,90 +292,147 @@ class PersistentIndex:
         """Obtiene las rutas de archivos para un idioma."""
         lang_dir = self._get_lang_dir(lang)
         return {
-            "inverted_index": lang_dir / "inverted_index.pkl",
-            "idf": lang_dir / "idf.json",
-            "doc_norms": lang_dir / "doc_norms.json",
-            "doc_metadata": lang_dir / "doc_metadata.json",
+            "terms": lang_dir / INVERTED_INDEX_FILES["terms"],
+            "term_offsets": lang_dir / INVERTED_INDEX_FILES["term_offsets"],
+            "postings_offsets": lang_dir / INVERTED_INDEX_FILES["postings_offsets"],
+            "postings_docs": lang_dir / INVERTED_INDEX_FILES["postings_docs"],
+            "postings_weights": lang_dir / INVERTED_INDEX_FILES["postings_weights"],
+            "term_max_weights": lang_dir / INVERTED_INDEX_FILES["term_max_weights"],
+            "doc_ids": lang_dir / DOC_IDS_FILES["doc_ids"],
+            "doc_id_offsets": lang_dir / DOC_IDS_FILES["doc_id_offsets"],
+            "doc_id_order": lang_dir / DOC_IDS_FILES["doc_id_order"],
+            "idf": lang_dir / "idf.npy",
+            "doc_norms": lang_dir / "doc_norms.npy",
+            **{key: lang_dir / name for key, name in DOC_METADATA_FILES.items()},
             "stats": lang_dir / "stats.json",
         }
     
     @property
-    def current_lang(self) -> str | None:
-        """Idioma actualmente cargado."""
-        return self._current_lang
+    def loaded_languages(self) -> list[str]:
+        """Idiomas cargados en memoria."""
+        return list(self._loaded)
+    
+    def language_stats(self) -> dict[str, dict[str, Any]]:
+        """
+        Idiomas con índice disponible -> contenido de su stats.json, sin cargar
+        los índices. Se cachea LANGUAGES_CACHE_TTL segundos (así aparecen los
+        índices reconstruidos por los scripts) y se invalida al guardar o borrar.
+        """
+        now = time.monotonic()
+        if self._languages_cache is None or now - self._languages_cached_at > LANGUAGES_CACHE_TTL:
+            languages: dict[str, dict[str, Any]] = {}
+            for lang in SUPPORTED_LANGUAGES:
+                if not self.exists(lang):
+                    continue
+                stats_path = self._get_paths(lang)["stats"]
+                languages[lang] = {}
+                if stats_path.exists():
+                    with open(stats_path, "r", encoding="utf-8") as f:
+                        languages[lang] = json.load(f)
+            self._languages_cache = languages
+            self._languages_cached_at = now
+        return self._languages_cache
     
     def available_languages(self) -> list[str]:
         """Lista de idiomas con índice disponible."""
-        available = []
-        for lang in SUPPORTED_LANGUAGES:
-            if self.exists(lang):
-                available.append(lang)
-        return available
+        return list(self.language_stats())
+    
+    def has_language(self, lang: str) -> bool:
+        """
+        Indica si hay índice para un idioma sin tocar el disco en cada consulta:
+        basta con que esté cargado o en la caché de language_stats.
+        """
+        return lang in self._loaded or lang in self.language_stats()
     
     def exists(self, lang: str | None = None) -> bool:
         """Verifica si el índice existe en disco para un idioma."""
         if lang is None:
-            lang = self._current_lang or DEFAULT_INDEX_LANG
+            lang = DEFAULT_INDEX_LANG
         paths = self._get_paths(lang)
         return (
-            paths["inverted_index"].exists() and
+            paths["terms"].exists() and
+            paths["term_offsets"].exists() and
+            paths["postings_offsets"].exists() and
+            paths["postings_docs"].exists() and
+            paths["postings_weights"].exists() and
+            paths["term_max_weights"].exists() and
+            paths["doc_ids"].exists() and
+            paths["doc_id_offsets"].exists() and
+            paths["doc_id_order"].exists() and
             paths["idf"].exists() and
             paths["doc_norms"].exists() and
-            paths["doc_metadata"].exists()
+            all(paths[key].exists() for key in DOC_METADATA_FILES)
         )
     
     def load(self, lang: str | None = None) -> bool:
-        """Carga el índice de un idioma desde disco a memoria."""
+        """Carga el índice de un idioma desde disco (si ya estaba cargado no hace nada)."""
         if lang is None:
             lang = DEFAULT_INDEX_LANG
         
         # Si ya está cargado este idioma, no recargar
-        if self._current_lang == lang and self._inverted_index is not None:
+        if lang in self._loaded:
             return True
         
         if not self.exists(lang):
             return False
         
+        lang_dir = self._get_lang_dir(lang)
         paths = self._get_paths(lang)
         print(f"Cargando índice [{lang}] desde disco...")
         
-        # Cargar índice invertido
-        with open(paths["inverted_index"], "rb") as f:
-            self._inverted_index = pickle.load(f)
-        
-        # Cargar IDF
-        with open(paths["idf"], "r", encoding="utf-8") as f:
-            self._idf = json.load(f)
-        
-        # Cargar normas de documentos
-        with open(paths["doc_norms"], "r", encoding="utf-8") as f:
-            self._doc_norms = json.load(f)
-        
-        # Cargar metadatos
-        with open(paths["doc_metadata"], "r", encoding="utf-8") as f:
-            self._doc_metadata = json.load(f)
+        # Índice invertido (CSR) y tabla doc_int_id -> ID del artículo, mapeados en memoria
+        inverted_index = load_inverted_index(lang_dir)
+        doc_ids = load_doc_ids(lang_dir)
         
         # Cargar estadísticas si existen
+        stats: dict[str, Any] = {}
         if paths["stats"].exists():
             with open(paths["stats"], "r", encoding="utf-8") as f:
-                self._stats = json.load(f)
-        else:
-            self._stats = {}
+                stats = json.load(f)
         
-        self._current_lang = lang
-        print(f"Índice [{lang}] cargado: {len(self._doc_metadata)} documentos, {len(self._inverted_index)} términos")
+        self._loaded[lang] = LanguageIndex(
+            inverted_index=inverted_index,
+            doc_ids=doc_ids,
+            idf=TermValues(inverted_index, np.load(paths["idf"], mmap_mode="r")),
+            doc_norms=np.load(paths["doc_norms"], mmap_mode="r"),
+            # Metadatos mapeados en memoria: solo se decodifican los documentos devueltos
+            doc_metadata=open_doc_metadata(lang_dir, doc_ids),
+            stats=stats,
+        )
+        print(f"Índice [{lang}] cargado: {len(doc_ids)} documentos, {len(inverted_index)} términos")
         return True
     
+    def load_all(self) -> list[str]:
+        """
+        Carga todos los idiomas disponibles (precarga al arrancar el servidor).
+        Devuelve los idiomas cargados.
+        """
+        for lang in self.available_languages():
+            self.load(lang)
+        return self.loaded_languages
+    
+    def get(self, lang: str) -> LanguageIndex | None:
+        """Índice de un idioma, cargándolo si hace falta (None si no existe en disco)."""
+        if lang not in self._loaded and not self.load(lang):
+            return None
+        return self._loaded[lang]
+    
     def save(
         self,
-        inverted_index: dict[str, list[tuple[str, float]]],
-        idf: dict[str, float],
-        doc_norms: dict[str, float],
-        doc_metadata: dict[str, dict[str, str]],
+        inverted_index: CSRIndex,
+        doc_ids: Sequence[str],
+        idf: np.ndarray,
+        doc_norms: np.ndarray,
+        doc_metadata: Mapping[str, dict[str, str]],
         stats: dict[str, Any] | None = None,
         lang: str = DEFAULT_INDEX_LANG,
     ) -> None:
-        """Guarda el índice en disco para un idioma."""
+        """
+        Guarda el índice en disco para un idioma y lo vuelve a abrir desde disco:
+        IDF y normas quedan como arrays float32 mapeados en memoria, igual que
+        tras reiniciar el servidor. Los pesos de `inverted_index` deben ser
+        TF-IDF ya divididos por la norma de su documento.
+        """
         lang_dir = self._get_lang_dir(lang)
         lang_dir.mkdir(parents=True, exist_ok=True)
         paths = self._get_paths(lang)
@@ -150,93 +440,48 @@ class PersistentIndex:
         print(f"Guardando índice [{lang}] en disco...")
         
         # Guardar índice invertido
-        with open(paths["inverted_index"], "wb") as f:
-            pickle.dump(inverted_index, f)
+        dump_inverted_index(inverted_index, lang_dir)
+        
+        # Guardar tabla doc_int_id -> ID del artículo
+        dump_doc_ids(doc_ids, lang_dir)
         
-        # Guardar IDF
-        with open(paths["idf"], "w", encoding="utf-8") as f:
-            json.dump(idf, f)
+        # Guardar IDF (alineado con el vocabulario del índice)
+        np.save(paths["idf"], np.asarray(idf, dtype=np.float32))
         
         # Guardar normas
-        with open(paths["doc_norms"], "w", encoding="utf-8") as f:
-            json.dump(doc_norms, f)
+        np.save(paths["doc_norms"], np.asarray(doc_norms, dtype=np.float32))
         
-        # Guardar metadatos
-        with open(paths["doc_metadata"], "w", encoding="utf-8") as f:
-            json.dump(doc_metadata, f)
+        # Guardar metadatos (en el orden de doc_ids)
+        dump_doc_metadata(doc_metadata, doc_ids, lang_dir)
         
         # Guardar estadísticas
         if stats:
             with open(paths["stats"], "w", encoding="utf-8") as f:
                 json.dump(stats, f, indent=2)
         
-        # Actualizar cache en memoria
-        self._inverted_index = inverted_index
-        self._idf = idf
-        self._doc_norms = doc_norms
-        self._doc_metadata = doc_metadata
-        self._stats = stats
-        self._current_lang = lang
+        print(f"Índice [{lang}] guardado: {len(doc_ids)} documentos, {len(inverted_index)} términos")
         
-        print(f"Índice [{lang}] guardado: {len(doc_metadata)} documentos, {len(inverted_index)} términos")
-    
-    @property
-    def inverted_index(self) -> dict[str, list[tuple[str, float]]]:
-        if self._inverted_index is None:
-            self.load(DEFAULT_INDEX_LANG)
-        return self._inverted_index or {}
-    
-    @property
-    def idf(self) -> dict[str, float]:
-        if self._idf is None:
-            self.load(DEFAULT_INDEX_LANG)
-        return self._idf or {}
-    
-    @property
-    def doc_norms(self) -> dict[str, float]:
-        if self._doc_norms is None:
-            self.load(DEFAULT_INDEX_LANG)
-        return self._doc_norms or {}
-    
-    @property
-    def doc_metadata(self) -> dict[str, dict[str, str]]:
-        if self._doc_metadata is None:
-            self.load(DEFAULT_INDEX_LANG)
-        return self._doc_metadata or {}
-    
-    @property
-    def stats(self) -> dict[str, Any]:
-        if self._stats is None:
-            self._stats = {}
-        return self._stats
-    
-    def get_document(self, doc_id: str) -> dict[str, str] | None:
-        """Obtiene los metadatos de un documento por su ID."""
-        return self.doc_metadata.get(doc_id)
+        # Actualizar cache en memoria reabriendo lo guardado (mapeado en memoria),
+        # así IDF y normas son los mismos float32 que se usarán tras reiniciar
+        self._languages_cache = None
+        self._loaded.pop(lang, None)
+        self.load(lang)
     
     def clear(self, lang: str | None = None) -> None:
         """Elimina el índice de disco y memoria para un idioma."""
         if lang is None:
-            lang = self._current_lang or DEFAULT_INDEX_LANG
+            lang = DEFAULT_INDEX_LANG
         
         paths = self._get_paths(lang)
         for path in paths.values():
             if path.exists():
                 path.unlink()
-        
-        if self._current_lang == lang:
-            self._inverted_index = None
-            self._idf = None
-            self._doc_norms = None
-            self._doc_metadata = None
-            self._stats = None
-            self._current_lang = None
+        self._languages_cache = None
+        self.unload(lang)
     
-    def unload(self) -> None:
-        """Descarga el índice de memoria sin eliminarlo de disco."""
-        self._inverted_index = None
-        self._idf = None
-        self._doc_norms = None
-        self._doc_metadata = None
-        self._stats = None
-        self._current_lang = None
+    def unload(self, lang: str | None = None) -> None:
+        """Descarga de memoria (sin eliminarlo de disco) el índice de un idioma, o todos si lang es None."""
+        if lang is None:
+            self._loaded.clear()
+        else:
+            self._loaded.pop(lang, None)
@@ -1,30 +1,47 @@
 import re
+import threading
 from functools import lru_cache
-from typing import Iterable
+from typing import Any, Callable, Iterable
 
 import nltk
+import regex
+import Stemmer
 from nltk.corpus import stopwords
-from nltk.stem.snowball import SnowballStemmer
 
 # Cache global para stopwords y stemmers (evita recrearlos por cada documento)
 _STOPWORDS_CACHE: dict[str, frozenset[str]] = {}
-_STEMMER_CACHE: dict[str, SnowballStemmer] = {}
+_STEMMER_CACHE: dict[str, Stemmer.Stemmer] = {}
+_STEM_FN_CACHE: dict[str, Callable[[str], str]] = {}
+
+# Tamaño de la cache token -> stem de cada idioma (distribución muy zipfiana)
+STEM_CACHE_SIZE = 200_000
+
+# Expresiones regulares precompiladas al importar el módulo
+_WS_RE = re.compile(r"\s+")
+# \w incluye letras, números y guion bajo; con UNICODE mantiene acentos. Se usa
+# el módulo `regex` (que también acepta las marcas combinantes, p. ej. acentos
+# NFD) sobre el texto original, pasando cada token a minúsculas después: el
+# mismo patrón y orden para documentos (index_terms) y consultas, para que todo
+# término indexado pueda encontrarse
+_TOKEN_RE = regex.compile(r"\w+", regex.UNICODE)
+
+# Al indexar se descartan los tokens más largos (URLs, cadenas sin espacios...)
+MAX_TOKEN_LENGTH = 32
 
 
 def normalize_text(text: str) -> str:
     """Normalización básica: minúsculas y espacios limpios."""
     text = text.lower()
     text = text.replace("\n", " ")
-    text = re.sub(r"\s+", " ", text)
+    text = _WS_RE.sub(" ", text)
     return text.strip()
 
 
 def tokenize_text(text: str) -> list[str]:
     """Tokenización sencilla basada en expresiones regulares."""
-    normalized = normalize_text(text)
-    # \w incluye letras, números y guion bajo; con UNICODE mantiene acentos.
-    tokens = re.findall(r"\w+", normalized, flags=re.UNICODE)
-    return tokens
+    # \w+ ya separa por espacios y puntuación: basta con pasar cada token a
+    # minúsculas, sin recorrer el texto una segunda vez para normalizar los espacios
+    return [t.lower() for t in _TOKEN_RE.findall(text)]
 
 
 def _normalize_language(language: str) -> str:
@@ -56,22 +73,106 @@ def _get_stopwords(language: str) -> frozenset[str]:
 
 
 def remove_stopwords_tokens(tokens: Iterable[str], language: str = "spanish") -> list[str]:
-    sw = _get_stopwords(language)
-    return [t for t in tokens if t.lower() not in sw]
-
-
-def _get_stemmer(language: str) -> SnowballStemmer:
-    """Obtiene stemmer cacheado para el idioma."""
+    """
+    Elimina las stopwords del idioma. Los tokens deben venir ya en minúsculas
+    (como los de tokenize_text): no se vuelven a convertir uno a uno.
+    """
+    is_stopword = _get_stopwords(language).__contains__
+    return [t for t in tokens if not is_stopword(t)]
+
+
+def _get_stemmer(language: str) -> Stemmer.Stemmer:
+    """
+    Obtiene stemmer Snowball cacheado para el idioma (PyStemmer, implementado
+    en C: `stemWord` para un token y `stemWords` para una lista).
+    """
     lang = _normalize_language(language)
     if lang not in _STEMMER_CACHE:
         try:
-            _STEMMER_CACHE[lang] = SnowballStemmer(lang)
-        except ValueError:
-            _STEMMER_CACHE[lang] = SnowballStemmer("english")
+            _STEMMER_CACHE[lang] = Stemmer.Stemmer(lang)
+        except KeyError:
+            _STEMMER_CACHE[lang] = Stemmer.Stemmer("english")
     return _STEMMER_CACHE[lang]
 
 
+def _get_cached_stem(language: str) -> Callable[[str], str]:
+    """
+    Obtiene `stemmer.stemWord` memoizado con lru_cache para el idioma. Un
+    stemmer de PyStemmer no admite llamadas concurrentes: como las búsquedas
+    se ejecutan en hilos, los fallos de la caché se serializan con un lock.
+    """
+    lang = _normalize_language(language)
+    if lang not in _STEM_FN_CACHE:
+        stemmer = _get_stemmer(lang)
+        lock = threading.Lock()
+
+        def stem(token: str) -> str:
+            with lock:
+                return stemmer.stemWord(token)
+
+        _STEM_FN_CACHE[lang] = lru_cache(maxsize=STEM_CACHE_SIZE)(stem)
+    return _STEM_FN_CACHE[lang]
+
+
 def lemmatize_or_stem_tokens(tokens: Iterable[str], language: str = "spanish") -> list[str]:
-    """Aplica stemming (como aproximación a lematización) con SnowballStemmer."""
-    stemmer = _get_stemmer(language)
-    return [stemmer.stem(t) for t in tokens]
+    """Aplica stemming (como aproximación a lematización) con el stemmer Snowball."""
+    stem = _get_cached_stem(language)
+    return [stem(t) for t in tokens]
+
+
+def analyze_text(
+    text: str, language: str = "spanish"
+) -> tuple[str, list[str], list[str], list[str]]:
+    """
+    Pipeline completo en una sola pasada por paso, conservando los resultados
+    intermedios: (normalizado, tokens, tokens sin stopwords, stems).
+    Los tokens se obtienen como en tokenize_text (e index_terms): del texto
+    original, pasando cada uno a minúsculas.
+    """
+    normalized = normalize_text(text)
+    tokens = tokenize_text(text)
+    sw = _get_stopwords(language)
+    tokens_no_sw = [t for t in tokens if t not in sw]
+    stem = _get_cached_stem(language)
+    stems = [stem(t) for t in tokens_no_sw]
+    return normalized, tokens, tokens_no_sw, stems
+
+
+def index_terms(
+    text: str,
+    stopwords: frozenset[str],
+    stemmer: Stemmer.Stemmer,
+    cache: dict[str, Any],
+    resolve: Callable[[str], Any] | None = None,
+) -> list:
+    """
+    Preprocesado de un documento para indexarlo, común a todos los pipelines de
+    construcción: tokens `\\w+` de hasta MAX_TOKEN_LENGTH caracteres, en
+    minúsculas, sin stopwords y stemizados.
+
+    Sin copiar el texto en minúsculas: findall devuelve los tokens desde C (sin
+    un objeto Match por token) y solo los fallos de `cache` se normalizan. La
+    caché guarda, por token tal como aparece en el texto, su stem (o
+    `resolve(stem)` si se indica, p. ej. su term_id) y None si es stopword.
+    Devuelve un valor por token que cuenta para el TF.
+    """
+    out = []
+    app = out.append
+    get = cache.get
+    stem = stemmer.stemWord
+    for t in _TOKEN_RE.findall(text):
+        if len(t) > MAX_TOKEN_LENGTH:
+            continue
+        value = get(t, cache)  # La propia caché como centinela de "no está"
+        if value is cache:
+            lower = t.lower()
+            if lower in stopwords:
+                value = None
+            else:
+                value = stem(lower)
+                if resolve is not None:
+                    value = resolve(value)
+            cache[t] = value
+        if value is not None:
+            app(value)
+    return out
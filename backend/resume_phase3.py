@@ -2,30 +2,44 @@
 Script para reanudar la construccion del indice desde la Fase 3.
 
 Usa los archivos ya generados:
-- doc_metadata.json (para obtener doc_ids)
-- idf.json (para calcular TF-IDF)
+- doc_ids.npy y doc_id_offsets.npy (tabla doc_int_id -> id del articulo)
+- idf.npy y el vocabulario ordenado (para calcular TF-IDF)
 
 Uso:
     python resume_phase3.py
 """
+import gc
+import heapq
 import json
-import pickle
-import re
+import os
+import shutil
 import time
-from collections import Counter, defaultdict
+from array import array
+from collections import defaultdict
+from collections.abc import Iterator
 from datetime import datetime
+from itertools import groupby
 from math import sqrt
+from multiprocessing import Pool
+from operator import itemgetter
 from pathlib import Path
 
+import numpy as np
+
 from config import INDEX_DIR, SNIPPET_LENGTH
+from indexing import count_terms_kernel, finalize_postings, gc_disabled, quantize_weights, tfidf_kernel
+from persistent_index import (
+    DOC_IDS_FILES,
+    INVERTED_INDEX_FILES,
+    dump_vocabulary,
+    load_doc_ids,
+    load_vocabulary,
+)
 
 # Directorio de salida para español
 OUTPUT_DIR = INDEX_DIR / "es"
-from preprocessing import _get_stopwords, _get_stemmer
-from wikipedia_loader import iter_wiki_articles
-
-# Regex precompilada para tokenizacion
-_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+from preprocessing import _get_stopwords, _get_stemmer, index_terms
+from wikipedia_loader import iter_shard_articles, list_wiki_shards
 
 # Directorio de datos
 DATA_DIR = Path(__file__).parent.parent / "datos"
@@ -45,26 +59,246 @@ LANGUAGE_MAP = {
 # Limite de postings por termino (para ahorrar memoria)
 MAX_POSTINGS_PER_TERM = 10000
 
+# Postings acumulados en memoria antes de volcarlos como segmento a disco
+# (~8 bytes por posting: unos 400 MB por segmento)
+SEGMENT_POSTINGS = 50_000_000
+
+# Arrays de cada segmento: term_ids del vocabulario presentes y postings en CSR
+_SEGMENT_FILES = {
+    "terms": "segment_terms.npy",
+    "offsets": "segment_offsets.npy",
+    "docs": "segment_docs.npy",
+    "weights": "segment_weights.npy",
+}
+_TMP_BUFFER_SIZE = 1 << 20
+
 # Total conocido de documentos en español (para mostrar progreso correcto)
 TOTAL_DOCS_ES = 3_725_687
 
+# Estado de cada proceso del pool (ver _init_worker): se hereda al crear el
+# proceso, sin serializar el IDF ni la tabla de doc_ids en cada tarea
+_worker_stopwords: frozenset[str] = frozenset()
+_worker_stemmer = None
+_worker_term_ids: dict[str, int] = {}
+_worker_idf = np.zeros(0)
+_worker_doc_index = np.zeros(0, dtype=np.int32)
+_worker_counts = np.zeros(0, dtype=np.int32)  # Buffer de conteos por term_id (count_terms_kernel)
+
+# Cache token (tal como aparece en el texto) -> term_id de cada proceso: la
+# distribucion de Wikipedia es muy zipfiana y casi todos los tokens son
+# aciertos. Las stopwords se guardan como None (ver index_terms) y los stems
+# fuera del vocabulario con este codigo: cuentan para el TF pero no generan posting
+_OUT_OF_VOCAB = -1
+_token_cache: dict[str, int | None] = {}
+
 
 def timestamp() -> str:
     """Devuelve marca de tiempo actual."""
     return datetime.now().strftime("%H:%M:%S")
 
 
-def preprocess_document_fast(text: str, stopwords: frozenset, stemmer) -> list[str]:
-    """Pipeline optimizado de preprocesamiento."""
-    text_lower = text.lower()
-    tokens = _TOKEN_PATTERN.findall(text_lower)
-    return [stemmer.stem(t) for t in tokens if t not in stopwords]
+def preprocess_document_fast(
+    text: str, stopwords: frozenset, stemmer, term_ids: dict[str, int]
+) -> tuple[np.ndarray, int]:
+    """
+    Pipeline optimizado de preprocesamiento hasta term_ids del vocabulario: el
+    mismo que el de indexing_build (index_terms), buscando cada stem en el
+    vocabulario una sola vez por proceso (cache).
+    Devuelve los term_ids de los tokens del vocabulario (int32, uno por
+    aparicion) y el numero de tokens sin stopwords (denominador del TF).
+    """
+    token_ids = np.array(
+        index_terms(text, stopwords, stemmer, _token_cache, lambda stem: term_ids.get(stem, _OUT_OF_VOCAB)),
+        dtype=np.int32,
+    )
+    return token_ids[token_ids != _OUT_OF_VOCAB], len(token_ids)
+
+
+def _init_worker(
+    language: str, term_ids: dict[str, int], idf: np.ndarray, doc_index: np.ndarray
+) -> None:
+    """Inicializa stopwords, stemmer, vocabulario, IDF y tabla de doc_ids en un proceso del pool."""
+    global _worker_stopwords, _worker_stemmer, _worker_term_ids, _worker_idf, _worker_doc_index, _worker_counts
+    gc.disable()  # Los procesos solo crean objetos sin ciclos (ver gc_disabled)
+    _worker_stopwords = _get_stopwords(language)
+    _worker_stemmer = _get_stemmer(language)
+    _token_cache.clear()  # Los stems dependen del idioma
+    _worker_term_ids = term_ids
+    _worker_idf = idf
+    _worker_doc_index = doc_index
+    _worker_counts = np.zeros(len(idf), dtype=np.int32)
+
+
+def _lookup_doc_int(article_id: str) -> int:
+    """doc_int_id de un articulo, o -1 si no esta en la tabla de doc_ids."""
+    # isdigit acepta caracteres como '²' que int() rechaza: solo digitos ASCII
+    if not (article_id.isascii() and article_id.isdecimal()):
+        return -1
+    i = int(article_id)
+    return int(_worker_doc_index[i]) if i < _worker_doc_index.size else -1
+
+
+def _is_indexed(article_id: str) -> bool:
+    """Filtro de iter_shard_articles: el articulo esta en la tabla de doc_ids."""
+    return _lookup_doc_int(article_id) >= 0
+
+
+def _process_shard(wiki_file: Path) -> tuple[dict[int, array], dict[int, array], list[tuple[int, float]]]:
+    """
+    Calcula los postings parciales de un archivo wiki_XX en un proceso del pool:
+    (term_id -> doc_int_ids, term_id -> TF-IDF / norma, [(doc_int_id, norma)]).
+    Los postings van en arrays tipados (int32 y float32), no en listas de objetos.
+    """
+    posting_docs: dict[int, array] = {}
+    posting_w: dict[int, array] = {}
+    norms = []
+    # Solo se usan el id y el texto: tuplas simples en lugar de WikiArticle, y
+    # los articulos fuera de la tabla de doc_ids se descartan sin parsear su texto
+    for article_id, text in iter_shard_articles(wiki_file, fields=("id", "text"), id_filter=_is_indexed):
+        doc_int = _lookup_doc_int(article_id)
+        if doc_int < 0:
+            continue
+
+        token_ids, n_tokens = preprocess_document_fast(text, _worker_stopwords, _worker_stemmer, _worker_term_ids)
+        if not n_tokens:
+            continue
+
+        # Conteos, TF-IDF y norma compilados con Numba sobre los term_ids;
+        # los postings guardan TF-IDF / norma
+        term_ids = np.empty(len(token_ids), dtype=np.int32)
+        counts = np.empty(len(token_ids), dtype=np.int32)
+        n_terms = count_terms_kernel(token_ids, _worker_counts, term_ids, counts)
+        tfidf = np.empty(n_terms, dtype=np.float64)
+        norm = sqrt(tfidf_kernel(term_ids[:n_terms], counts[:n_terms], n_tokens, _worker_idf, tfidf))
+        if norm > 0.0:
+            for term_id, weight in zip(term_ids[:n_terms].tolist(), (tfidf / norm).tolist()):
+                docs = posting_docs.get(term_id)
+                if docs is None:
+                    docs = posting_docs[term_id] = array("i")
+                    posting_w[term_id] = array("f")
+                docs.append(doc_int)
+                posting_w[term_id].append(weight)
+
+        norms.append((doc_int, norm))
+    return posting_docs, posting_w, norms
+
+
+def _dump_segment(posting_docs: dict[int, array], posting_w: dict[int, array], segment_dir: Path) -> None:
+    """
+    Vuelca los postings acumulados como un segmento: term_ids presentes (en
+    orden, que es el del vocabulario) y postings sin ordenar de cada termino
+    (doc int32, peso float32) en formato CSR. Vacia los diccionarios de entrada.
+    """
+    segment_dir.mkdir(parents=True)
+    terms = sorted(posting_docs)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(posting_docs[term]) for term in terms], out=offsets[1:])
+    total = int(offsets[-1])
+    docs = np.lib.format.open_memmap(segment_dir / _SEGMENT_FILES["docs"], mode="w+", dtype=np.int32, shape=(total,))
+    weights = np.lib.format.open_memmap(
+        segment_dir / _SEGMENT_FILES["weights"], mode="w+", dtype=np.float32, shape=(total,)
+    )
+    for i, term in enumerate(terms):
+        a, b = offsets[i], offsets[i + 1]
+        docs[a:b] = np.frombuffer(posting_docs.pop(term), dtype=np.int32)
+        weights[a:b] = np.frombuffer(posting_w.pop(term), dtype=np.float32)
+    docs.flush()
+    weights.flush()
+    del docs, weights
+    np.save(segment_dir / _SEGMENT_FILES["terms"], np.array(terms, dtype=np.int64))
+    np.save(segment_dir / _SEGMENT_FILES["offsets"], offsets)
+
+
+def _load_segment(segment_dir: Path) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Abre (mapeado en memoria) un segmento: (term_ids, offsets, docs, pesos)."""
+    return tuple(
+        np.load(segment_dir / _SEGMENT_FILES[key], mmap_mode="r") for key in ("terms", "offsets", "docs", "weights")
+    )
+
+
+def _iter_segment(segment: int, terms: np.ndarray) -> Iterator[tuple[int, int, int]]:
+    """Recorre los term_ids ordenados de un segmento como (term_id, segmento, posicion)."""
+    for i, term_id in enumerate(terms.tolist()):
+        yield term_id, segment, i
+
+
+def _merge_segments(segment_dirs: list[Path], output_dir: Path) -> np.ndarray:
+    """
+    Fusiona los segmentos en el indice invertido final (k-way merge de sus
+    term_ids ordenados): los postings de cada termino se concatenan en orden de
+    segmento, se ordenan y limitan con `finalize_postings`, se cuantizan y se
+    escriben en streaming. Devuelve los term_ids del vocabulario de entrada
+    presentes en el indice, en orden; el vocabulario no se toca (ver
+    _replace_vocabulary).
+    """
+    segments = [_load_segment(segment_dir) for segment_dir in segment_dirs]
+    streams = [_iter_segment(i, segment[0]) for i, segment in enumerate(segments)]
+    terms = array("q")
+    offsets = array("q", [0])
+    max_weights = array("f")
+    docs_tmp = output_dir / "postings_docs.tmp"
+    weights_tmp = output_dir / "postings_weights.tmp"
+
+    with open(docs_tmp, "wb", buffering=_TMP_BUFFER_SIZE) as docs_out, \
+         open(weights_tmp, "wb", buffering=_TMP_BUFFER_SIZE) as weights_out:
+        for term, group in groupby(heapq.merge(*streams), key=itemgetter(0)):
+            term_docs, term_weights = [], []
+            for _, segment, i in group:
+                _, seg_offsets, seg_docs, seg_weights = segments[segment]
+                a, b = seg_offsets[i], seg_offsets[i + 1]
+                term_docs.append(seg_docs[a:b])
+                term_weights.append(seg_weights[a:b])
+            docs, weights = finalize_postings(
+                np.concatenate(term_docs), np.concatenate(term_weights), MAX_POSTINGS_PER_TERM
+            )
+            quantized, max_weight = quantize_weights(weights)
+            docs_out.write(docs.tobytes())
+            weights_out.write(quantized.tobytes())
+            terms.append(term)
+            offsets.append(offsets[-1] + len(docs))
+            max_weights.append(max_weight)
+    del segments, streams
+
+    # Temporales -> .npy (el tamaño final solo se conoce al terminar la fusion)
+    for tmp_path, key, dtype in (
+        (docs_tmp, "postings_docs", np.int32),
+        (weights_tmp, "postings_weights", np.uint8),
+    ):
+        data = np.lib.format.open_memmap(
+            output_dir / INVERTED_INDEX_FILES[key], mode="w+", dtype=dtype, shape=(offsets[-1],)
+        )
+        if len(data):
+            data[:] = np.memmap(tmp_path, dtype=dtype, mode="r")
+        data.flush()
+        del data
+        tmp_path.unlink()
+
+    np.save(output_dir / INVERTED_INDEX_FILES["postings_offsets"], np.frombuffer(offsets, dtype=np.int64))
+    np.save(output_dir / INVERTED_INDEX_FILES["term_max_weights"], np.frombuffer(max_weights, dtype=np.float32))
+    return np.frombuffer(terms, dtype=np.int64)
+
+
+def _replace_vocabulary(terms: list[str], idf: np.ndarray, output_dir: Path) -> None:
+    """
+    Sustituye el vocabulario y el IDF de entrada por los del indice final. Se
+    escriben antes en un directorio temporal y se mueven juntos con os.replace:
+    una ejecucion interrumpida no deja en disco un vocabulario desalineado con
+    idf.npy, que son las entradas de la siguiente reanudacion.
+    """
+    staging_dir = output_dir / "vocabulary.tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    staging_dir.mkdir()
+    dump_vocabulary(terms, staging_dir)
+    np.save(staging_dir / "idf.npy", idf)
+    for name in (INVERTED_INDEX_FILES["terms"], INVERTED_INDEX_FILES["term_offsets"], "idf.npy"):
+        os.replace(staging_dir / name, output_dir / name)
+    staging_dir.rmdir()
 
 
 def resume_from_phase3() -> None:
     """
     Reanuda la construccion del indice desde la Fase 3.
-    Requiere que doc_metadata.json e idf.json existan.
+    Requiere que la tabla de doc_ids, idf.npy y el vocabulario existan.
     """
     print("=" * 60)
     print(f"[{timestamp()}] REANUDANDO CONSTRUCCION DEL INDICE (Fase 3)")
@@ -77,45 +311,65 @@ def resume_from_phase3() -> None:
     # =========================================================================
     print(f"\n[{timestamp()}] Cargando datos de fases anteriores...")
 
-    # Cargar doc_ids desde metadatos
-    metadata_file = OUTPUT_DIR / "doc_metadata.json"
-    if not metadata_file.exists():
-        print(f"  [ERROR] No se encontro {metadata_file}")
+    # Cargar doc_ids (tabla guardada al final de la Fase 1)
+    doc_ids_file = OUTPUT_DIR / DOC_IDS_FILES["doc_ids"]
+    if not doc_ids_file.exists():
+        print(f"  [ERROR] No se encontro {doc_ids_file}")
         print("  Ejecuta build_index.py primero para completar Fase 1 y 2")
         return
 
-    print(f"  [{timestamp()}] Cargando doc_metadata.json...")
-    with open(metadata_file, "r", encoding="utf-8") as f:
-        doc_metadata = json.load(f)
+    print(f"  [{timestamp()}] Cargando tabla de doc_ids...")
     
-    doc_ids = set(doc_metadata.keys())
-    doc_count = len(doc_ids)
+    # id del articulo (numerico en WikiExtractor) -> doc_int_id, como array int32
+    # indexado por el propio id (-1 = no indexado): 4 bytes por id en lugar de un
+    # dict con millones de cadenas
+    article_ids = np.fromiter(map(int, load_doc_ids(OUTPUT_DIR)), dtype=np.int64)
+    doc_count = len(article_ids)
+    doc_index = np.full(int(article_ids.max()) + 1 if doc_count else 0, -1, dtype=np.int32)
+    doc_index[article_ids] = np.arange(doc_count, dtype=np.int32)
+    del article_ids
     print(f"  [{timestamp()}] {doc_count:,} documentos encontrados")
-    
-    del doc_metadata  # Liberar memoria
 
     # Cargar IDF
-    idf_file = OUTPUT_DIR / "idf.json"
+    idf_file = OUTPUT_DIR / "idf.npy"
     if not idf_file.exists():
         print(f"  [ERROR] No se encontro {idf_file}")
         return
 
-    print(f"  [{timestamp()}] Cargando idf.json...")
-    with open(idf_file, "r", encoding="utf-8") as f:
-        idf = json.load(f)
+    print(f"  [{timestamp()}] Cargando idf.npy y vocabulario...")
+    # IDF indexado por term_id del vocabulario ordenado (float64, como el calculo por documento)
+    vocabulary = list(load_vocabulary(OUTPUT_DIR))  # Decodificado: se sustituye en la Fase 5
+    term_ids = {term: i for i, term in enumerate(vocabulary)}
+    idf = np.load(idf_file).astype(np.float64)
     
-    print(f"  [{timestamp()}] {len(idf):,} terminos en vocabulario")
+    print(f"  [{timestamp()}] {len(term_ids):,} terminos en vocabulario")
 
     # =========================================================================
     # FASE 3: Segunda pasada - Construir indice invertido
     # =========================================================================
     print(f"\n[{timestamp()}] [FASE 3] Construyendo indice invertido...")
-    print(f"  (Limitando a {MAX_POSTINGS_PER_TERM:,} postings por termino)")
 
-    inverted_index = defaultdict(list)
-    doc_norms = {}
+    # Postings en arrays paralelos (SoA): 4 bytes por doc_int_id y por peso, sin
+    # un objeto Python por posting. Al pasar de SEGMENT_POSTINGS se vuelcan como
+    # un segmento a disco (SPIMI) y la memoria queda acotada
+    posting_docs = defaultdict(lambda: array("i"))  # termino -> doc_int_ids (int32)
+    posting_w = defaultdict(lambda: array("f"))     # termino -> TF-IDF / norma (float32)
+    pending = 0                                     # postings en memoria
+    doc_norms = np.zeros(doc_count, dtype=np.float32)  # Indexado por doc_int_id
     processed = 0
 
+    segments_dir = OUTPUT_DIR / "segments.tmp"
+    shutil.rmtree(segments_dir, ignore_errors=True)  # Restos de una ejecucion interrumpida
+    segment_dirs: list[Path] = []
+
+    def flush_segment() -> None:
+        nonlocal pending
+        segment_dir = segments_dir / f"segment_{len(segment_dirs):03d}"
+        _dump_segment(posting_docs, posting_w, segment_dir)
+        segment_dirs.append(segment_dir)
+        print(f"  [{timestamp()}] Segmento {len(segment_dirs)} volcado ({pending:,} postings)")
+        pending = 0
+
     for lang_code, extracted_dir in EXTRACTED_DIRS.items():
         if not extracted_dir.exists():
             print(f"  [WARN] Directorio no encontrado: {extracted_dir}")
@@ -123,74 +377,63 @@ def resume_from_phase3() -> None:
 
         language = LANGUAGE_MAP[lang_code]
         print(f"\n  [{timestamp()}] Procesando Wikipedia {lang_code.upper()} ({language})...")
-        
-        stopwords = _get_stopwords(language)
-        stemmer = _get_stemmer(language)
-
-        for article in iter_wiki_articles(extracted_dir, max_docs=None):
-            if article.id not in doc_ids:
-                continue
-
-            tokens = preprocess_document_fast(article.text, stopwords, stemmer)
-            if not tokens:
-                continue
-
-            term_counts = Counter(tokens)
-            n_tokens = len(tokens)
-
-            # Calcular TF-IDF y norma
-            norm_sq = 0.0
-            for term, count in term_counts.items():
-                if term not in idf:
-                    continue
-                tfidf = (count / n_tokens) * idf[term]
-                norm_sq += tfidf * tfidf
-                
-                # Solo agregar si no hemos alcanzado el limite
-                if len(inverted_index[term]) < MAX_POSTINGS_PER_TERM:
-                    inverted_index[term].append((article.id, tfidf))
-
-            doc_norms[article.id] = sqrt(norm_sq)
-            processed += 1
-
-            if processed % 10000 == 0:
-                elapsed = time.time() - start_time
-                rate = processed / elapsed if elapsed > 0 else 0
-                pct = (processed / TOTAL_DOCS_ES) * 100
-                print(f"  [{timestamp()}] {processed:,}/{TOTAL_DOCS_ES:,} ({pct:.1f}%) | {rate:.0f} docs/s")
+
+        shards = list_wiki_shards(extracted_dir)
+        print(f"  {len(shards):,} archivos wiki_XX en {extracted_dir}")
+
+        # Cada proceso del pool calcula los postings de un shard completo; el padre
+        # los une en orden de shard (imap ordenado: el indice no depende del reparto)
+        with Pool(initializer=_init_worker, initargs=(language, term_ids, idf, doc_index)) as pool, gc_disabled():
+            for shard_docs, shard_w, shard_norms in pool.imap(_process_shard, shards):
+                for term, docs in shard_docs.items():
+                    posting_docs[term].extend(docs)
+                    posting_w[term].extend(shard_w[term])
+                    pending += len(docs)
+                for doc_int, norm in shard_norms:
+                    doc_norms[doc_int] = norm
+                if pending >= SEGMENT_POSTINGS:
+                    flush_segment()
+
+                previous = processed
+                processed += len(shard_norms)
+                if processed // 10000 > previous // 10000:
+                    elapsed = time.time() - start_time
+                    rate = processed / elapsed if elapsed > 0 else 0
+                    pct = (processed / TOTAL_DOCS_ES) * 100
+                    print(f"  [{timestamp()}] {processed:,}/{TOTAL_DOCS_ES:,} ({pct:.1f}%) | {rate:.0f} docs/s")
+
+    if pending or not segment_dirs:
+        flush_segment()
 
     print(f"\n  [{timestamp()}] Indexados: {processed:,} documentos")
 
     # =========================================================================
-    # FASE 4: Ordenar postings
+    # FASE 4: Fusionar segmentos y ordenar postings
     # =========================================================================
-    print(f"\n[{timestamp()}] [FASE 4] Ordenando postings por relevancia...")
+    print(f"\n[{timestamp()}] [FASE 4] Fusionando {len(segment_dirs)} segmentos y ordenando postings...")
+    print(f"  (Conservando los {MAX_POSTINGS_PER_TERM:,} postings de mayor peso por termino)")
 
-    sorted_count = 0
-    total_terms = len(inverted_index)
-    for term in inverted_index:
-        inverted_index[term].sort(key=lambda x: x[1], reverse=True)
-        sorted_count += 1
-        if sorted_count % 500000 == 0:
-            print(f"  [{timestamp()}] {sorted_count:,}/{total_terms:,} terminos ordenados...")
+    # Postings finales en formato CSR (doc_int_id int32, tfidf/norma uint8 cuantizado),
+    # escritos directamente a disco
+    terms = _merge_segments(segment_dirs, OUTPUT_DIR)
+    shutil.rmtree(segments_dir)
+    print(f"  [{timestamp()}] {len(terms):,} terminos ordenados")
 
     # =========================================================================
-    # FASE 5: Guardar indice final
+    # FASE 5: Guardar IDF, normas y estadisticas
     # =========================================================================
     print(f"\n[{timestamp()}] [FASE 5] Guardando indice en disco...")
 
-    print(f"  [{timestamp()}] Guardando inverted_index.pkl...")
-    with open(OUTPUT_DIR / "inverted_index.pkl", "wb") as f:
-        pickle.dump(dict(inverted_index), f)
+    print(f"  [{timestamp()}] Guardando vocabulario e idf.npy...")
+    _replace_vocabulary([vocabulary[term] for term in terms], idf[terms].astype(np.float32), OUTPUT_DIR)
 
-    print(f"  [{timestamp()}] Guardando doc_norms.json...")
-    with open(OUTPUT_DIR / "doc_norms.json", "w", encoding="utf-8") as f:
-        json.dump(doc_norms, f)
+    print(f"  [{timestamp()}] Guardando doc_norms.npy...")
+    np.save(OUTPUT_DIR / "doc_norms.npy", doc_norms)
 
     elapsed = time.time() - start_time
     stats = {
         "total_documents": doc_count,
-        "vocabulary_size": len(inverted_index),
+        "vocabulary_size": len(terms),
         "build_time_seconds": round(elapsed, 2),
         "languages": list(EXTRACTED_DIRS.keys()),
         "max_postings_per_term": MAX_POSTINGS_PER_TERM,
@@ -206,7 +449,7 @@ def resume_from_phase3() -> None:
     print(f"[{timestamp()}] INDICE CONSTRUIDO EXITOSAMENTE")
     print("=" * 60)
     print(f"  Documentos indexados: {processed:,}")
-    print(f"  Terminos en vocabulario: {len(inverted_index):,}")
+    print(f"  Terminos en vocabulario: {len(terms):,}")
     print(f"  Tiempo total: {elapsed:.1f}s ({elapsed/60:.1f} min)")
     print(f"  Indice guardado en: {OUTPUT_DIR}")
     print("=" * 60)
@@ -0,0 +1,16 @@
+"""
+Pruebas del ranking: los empates se resuelven siempre por doc_int_id.
+Ejecutar desde backend/ con: python -m pytest -q
+"""
+import numpy as np
+
+from indexing import CSRIndex, rank_documents
+
+
+def test_empates_por_doc_int_id_menor():
+    # Postings en orden inverso al de doc_int_id; todos con el mismo peso
+    index = CSRIndex.from_postings({"futbol": (np.array([5, 3, 1, 4, 0, 2]), np.full(6, 0.5))})
+    idf = np.ones(1, dtype=np.float32)
+    ranking, total = rank_documents(["futbol"], index, idf, n_docs=6, top_k=3)
+    assert [doc for doc, _ in ranking] == [0, 1, 2]
+    assert total == 6
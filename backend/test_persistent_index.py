@@ -0,0 +1,41 @@
+"""
+Pruebas del índice persistente: lo guardado con save() se sirve igual que tras reiniciar.
+Ejecutar desde backend/ con: python -m pytest -q
+"""
+import numpy as np
+
+from indexing import CSRIndex
+from persistent_index import PersistentIndex
+
+
+def test_save_reabre_idf_y_normas_como_float32_mapeados(tmp_path):
+    index = PersistentIndex(tmp_path)
+    inverted_index = CSRIndex.from_postings({
+        "futbol": (np.array([1, 0]), np.array([0.8, 0.3])),
+        "lig": (np.array([0]), np.array([0.5])),
+    })
+    idf = np.array([1.5, 2.25], dtype=np.float64)
+    doc_norms = np.array([0.75, 1.0], dtype=np.float64)
+    index.save(
+        inverted_index,
+        ["10", "7"],
+        idf,
+        doc_norms,
+        {"10": {"title": "Fútbol"}, "7": {"title": "Liga"}},
+        stats={"total_documents": 2},
+        lang="es",
+    )
+
+    saved = index.get("es")
+    assert isinstance(saved.idf.values, np.memmap) and saved.idf.values.dtype == np.float32
+    assert isinstance(saved.doc_norms, np.memmap) and saved.doc_norms.dtype == np.float32
+    np.testing.assert_array_equal(saved.idf.values, idf.astype(np.float32))
+    np.testing.assert_array_equal(saved.doc_norms, doc_norms.astype(np.float32))
+
+    # El mismo índice abierto por un proceso nuevo (tras reiniciar)
+    restarted = PersistentIndex(tmp_path).get("es")
+    np.testing.assert_array_equal(restarted.idf.values, saved.idf.values)
+    np.testing.assert_array_equal(restarted.doc_norms, saved.doc_norms)
+    assert saved.doc_metadata["7"]["title"] == "Liga"
+    assert saved.stats == {"total_documents": 2}
+    assert list(saved.inverted_index["futbol"][0]) == [1, 0]
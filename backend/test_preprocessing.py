@@ -0,0 +1,29 @@
+"""
+Pruebas del preprocesamiento: las consultas se analizan igual que los documentos.
+Ejecutar desde backend/ con: python -m pytest -q
+"""
+import unicodedata
+
+import pytest
+
+from preprocessing import _get_stemmer, _get_stopwords, analyze_text, index_terms, tokenize_text
+
+TEXTOS_NO_ASCII = [
+    "Café con leche en la cafetería",
+    unicodedata.normalize("NFD", "Canción del fútbol en Logroño"),  # Acentos como marcas combinantes
+    "İstanbul y Çanakkale",                                          # Cambian de longitud al pasar a minúsculas
+    "ΣΟΦΊΑ Ñandú ÅNGSTRÖM straße",
+    "Número 3² de la ﬁesta",                                         # Superíndices y ligaduras
+]
+
+
+@pytest.mark.parametrize("text", TEXTOS_NO_ASCII)
+def test_consulta_y_documento_dan_los_mismos_stems(text):
+    _, _, _, stems = analyze_text(text, language="spanish")
+    expected = index_terms(text, _get_stopwords("spanish"), _get_stemmer("spanish"), {})
+    assert stems == expected
+
+
+def test_tokens_con_marcas_combinantes():
+    text = unicodedata.normalize("NFD", "café İstanbul")
+    assert tokenize_text(text) == [t.lower() for t in text.split()]
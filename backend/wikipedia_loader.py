@@ -2,11 +2,31 @@
 Módulo para cargar artículos de Wikipedia desde los archivos JSON
 generados por WikiExtractor.
 """
-import json
+import io
+import os
+import re
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Iterator, NamedTuple
+
+import orjson
+
 from config import EXTRACTED_DIR
 
+# Buffer de lectura de cada archivo wiki_XX
+READ_BUFFER_SIZE = 1 << 20
+
+# Lectura anticipada en iter_wiki_articles: archivos wiki_XX leídos por
+# adelantado y hilos que los leen (la lectura de disco libera el GIL)
+PREFETCH_SHARDS = 8
+READ_THREADS = 4
+
+# "id" al principio de la línea (WikiExtractor lo escribe como primer campo):
+# permite filtrar por id sin parsear el resto de la línea
+_ID_PREFIX = re.compile(rb'\{\s*"id":\s*"([^"\\]*)"')
+
 
 class WikiArticle(NamedTuple):
     """Representa un artículo de Wikipedia."""
@@ -16,9 +36,9 @@ class WikiArticle(NamedTuple):
     text: str
 
 
-def iter_wiki_articles(extracted_dir: Path = EXTRACTED_DIR, max_docs: int | None = None) -> Iterator[WikiArticle]:
+def list_wiki_shards(extracted_dir: Path = EXTRACTED_DIR) -> list[Path]:
     """
-    Itera sobre todos los artículos de Wikipedia extraídos.
+    Devuelve la lista ordenada de archivos wiki_XX (manifiesto de shards).
     
     WikiExtractor genera una estructura de directorios:
     extracted/
@@ -30,63 +50,160 @@ def iter_wiki_articles(extracted_dir: Path = EXTRACTED_DIR, max_docs: int | None
     │   └── ...
     └── ...
     
-    Cada archivo wiki_XX contiene líneas JSON con formato:
+    El directorio se recorre una sola vez con os.scandir; quien procese el
+    corpus varias veces (o en paralelo por shard) puede reutilizar la lista.
+    """
+    if not extracted_dir.exists():
+        raise FileNotFoundError(f"Directorio de extracción no encontrado: {extracted_dir}")
+    
+    shards: list[Path] = []
+    with os.scandir(extracted_dir) as subdirs:
+        for subdir in sorted(subdirs, key=lambda entry: entry.name):
+            if not subdir.is_dir():
+                continue
+            with os.scandir(subdir.path) as files:
+                shards.extend(
+                    Path(entry.path) for entry in sorted(files, key=lambda entry: entry.name)
+                    if entry.is_file()
+                )
+    return shards
+
+
+def _parse_articles(
+    lines: Iterable[bytes],
+    fields: tuple[str, ...] | None = None,
+    id_filter: Callable[[str], bool] | None = None,
+) -> Iterator[WikiArticle | tuple]:
+    """
+    Parsea las líneas JSON de un archivo wiki_XX con formato:
     {"id": "12", "url": "https://...", "title": "...", "text": "..."}
     
+    Las líneas llegan como bytes y se parsean con orjson, que valida y
+    decodifica el UTF-8 al construir cada cadena (sin decodificar la línea entera).
+    Con `fields` se devuelve una tupla simple con solo esos campos en lugar de
+    un WikiArticle. Con `id_filter`, los artículos cuyo id no lo cumple se
+    descartan leyendo solo el principio de la línea, sin parsear el texto.
+    """
+    for line in lines:
+        if not line or line.isspace():
+            continue
+        
+        # Filtro por id sobre los bytes; si la línea no empieza por "id" se
+        # comprueba tras parsearla
+        match = None
+        if id_filter is not None:
+            match = _ID_PREFIX.match(line)
+            if match is not None and not id_filter(match.group(1).decode("utf-8")):
+                continue
+        
+        try:
+            article = orjson.loads(line)
+            if id_filter is not None and match is None and not id_filter(article.get("id", "")):
+                continue
+            
+            # Filtrar artículos vacíos o muy cortos
+            text = article.get("text", "").strip()
+            if len(text) < 100:
+                continue
+            
+            if fields is not None:
+                article["text"] = text
+                yield tuple([article.get(field, "") for field in fields])
+                continue
+            
+            yield WikiArticle(
+                id=article.get("id", ""),
+                title=article.get("title", ""),
+                url=article.get("url", ""),
+                text=text,
+            )
+                
+        except orjson.JSONDecodeError:
+            continue
+
+
+def _read_shard(wiki_file: Path) -> bytes:
+    """Lee un archivo wiki_XX completo (en un hilo de lectura anticipada)."""
+    with open(wiki_file, "rb") as f:
+        return f.read()
+
+
+def iter_shard_articles(
+    wiki_file: Path,
+    fields: tuple[str, ...] | None = None,
+    id_filter: Callable[[str], bool] | None = None,
+) -> Iterator[WikiArticle | tuple]:
+    """
+    Itera sobre los artículos de un archivo wiki_XX, leído de principio a fin
+    con un buffer de READ_BUFFER_SIZE.
+    
+    Args:
+        wiki_file: Archivo wiki_XX
+        fields: Campos a devolver como tupla simple, p. ej. ("id", "text")
+            (None = WikiArticle completo)
+        id_filter: Predicado sobre el id; los artículos que no lo cumplen se
+            descartan sin parsear su texto (None = todos)
+    """
+    try:
+        with open(wiki_file, "rb", buffering=READ_BUFFER_SIZE) as f:
+            yield from _parse_articles(f, fields, id_filter)
+    
+    except Exception as e:
+        print(f"Error leyendo {wiki_file}: {e}")
+
+
+def iter_wiki_articles(
+    extracted_dir: Path = EXTRACTED_DIR,
+    max_docs: int | None = None,
+    shards: list[Path] | None = None,
+    fields: tuple[str, ...] | None = None,
+    id_filter: Callable[[str], bool] | None = None,
+) -> Iterator[WikiArticle | tuple]:
+    """
+    Itera sobre todos los artículos de Wikipedia extraídos.
+    
     Args:
         extracted_dir: Directorio raíz de los artículos extraídos
         max_docs: Número máximo de documentos a cargar (None = todos)
+        shards: Manifiesto ya calculado con list_wiki_shards (None = recorrer extracted_dir)
+        fields: Campos a devolver como tupla simple, p. ej. ("id", "text")
+            (None = WikiArticle completo)
+        id_filter: Predicado sobre el id; los artículos que no lo cumplen se
+            descartan sin parsear su texto (None = todos)
     
     Yields:
-        WikiArticle con id, title, url y text
+        WikiArticle con id, title, url y text (o la tupla de `fields`)
     """
-    if not extracted_dir.exists():
-        raise FileNotFoundError(f"Directorio de extracción no encontrado: {extracted_dir}")
+    if shards is None:
+        shards = list_wiki_shards(extracted_dir)
     
+    # Los siguientes PREFETCH_SHARDS archivos se leen en hilos mientras se
+    # parsea el actual, de modo que el parseo no espera al disco
+    executor = ThreadPoolExecutor(max_workers=READ_THREADS)
+    pending: deque[tuple[Path, Future[bytes]]] = deque()
+    next_shard = 0
     doc_count = 0
-    
-    # Recorrer todos los subdirectorios (AA, AB, AC, ...)
-    for subdir in sorted(extracted_dir.iterdir()):
-        if not subdir.is_dir():
-            continue
-        
-        # Recorrer todos los archivos wiki_XX en cada subdirectorio
-        for wiki_file in sorted(subdir.iterdir()):
-            if not wiki_file.is_file():
-                continue
+    try:
+        while pending or next_shard < len(shards):
+            while next_shard < len(shards) and len(pending) < PREFETCH_SHARDS:
+                pending.append((shards[next_shard], executor.submit(_read_shard, shards[next_shard])))
+                next_shard += 1
             
+            wiki_file, future = pending.popleft()
             try:
-                with open(wiki_file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        try:
-                            article = json.loads(line)
-                            
-                            # Filtrar artículos vacíos o muy cortos
-                            text = article.get("text", "").strip()
-                            if len(text) < 100:
-                                continue
-                            
-                            yield WikiArticle(
-                                id=article.get("id", ""),
-                                title=article.get("title", ""),
-                                url=article.get("url", ""),
-                                text=text,
-                            )
-                            
-                            doc_count += 1
-                            if max_docs and doc_count >= max_docs:
-                                return
-                                
-                        except json.JSONDecodeError:
-                            continue
-                            
+                # Las líneas de los bytes ya leídos se recorren con BytesIO, como
+                # las de un archivo binario (más rápido que bytes.split)
+                for article in _parse_articles(io.BytesIO(future.result()), fields, id_filter):
+                    yield article
+                    
+                    doc_count += 1
+                    if max_docs and doc_count >= max_docs:
+                        return
+            
             except Exception as e:
                 print(f"Error leyendo {wiki_file}: {e}")
-                continue
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 def count_articles(extracted_dir: Path = EXTRACTED_DIR) -> int:
@@ -84,7 +84,7 @@ function App() {
       setTotalResults(response.total_results);
       setCurrentPage(1); // Reiniciar a página 1 en nueva búsqueda
       // Actualizar stats despues de la busqueda (el indice ya esta cargado)
-      const updatedStats = await getStats();
+      const updatedStats = await getStats(selectedLang);
       setStats(updatedStats);
     } catch (e) {
       setError(e instanceof Error ? e.message : 'Error desconocido');
@@ -20,8 +20,9 @@ export async function search(query: string, lang: string = 'es', topK: number =
   return response.json();
 }
 
-export async function getStats(): Promise<IndexStats> {
-  const response = await fetch(`${API_BASE}/stats`);
+export async function getStats(lang: string = 'es'): Promise<IndexStats> {
+  const params = new URLSearchParams({ lang: lang });
+  const response = await fetch(`${API_BASE}/stats?${params}`);
   
   if (!response.ok) {
     throw new Error(`Error obteniendo estadísticas: ${response.statusText}`);